@@ -0,0 +1,145 @@
+"""
+Deterministic generator of synthetic PUP and SLB2 files for the benchmarks.
+
+The same size and seed always produce the same bytes. Files are sparse: the
+payloads (LZMA streams, PNG and ELF files, high-entropy regions) fill about
+fill_ratio of the file and the gaps are left as holes, so multi-GB files
+are quick to create and take little disk space on filesystems with sparse
+file support.
+"""
+import lzma
+import os
+import random
+import struct
+import sys
+import zlib
+from typing import List, Optional
+
+PS4_MAGIC = b'\x4F\x15\x3D\x1D'
+SLB2_MAGIC = b'SLB2'
+SECTOR_SIZE = 0x200
+
+def parse_size(text: str) -> int:
+    """Parse sizes like 64M, 1G or 4096"""
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+def _text_like(rnd: random.Random, size: int) -> bytes:
+    """Compressible data: words drawn from a small vocabulary"""
+    words = [bytes(rnd.choices(range(97, 123), k=rnd.randint(2, 9))) for _ in range(512)]
+    data = bytearray()
+    while len(data) < size:
+        data += rnd.choice(words) + b' '
+    return bytes(data[:size])
+
+def _lzma_stream(rnd: random.Random, size: int) -> bytes:
+    return lzma.compress(_text_like(rnd, size), format=lzma.FORMAT_ALONE, preset=1)
+
+def _png(rnd: random.Random, width: int, height: int) -> bytes:
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body))
+
+    rows = b''.join(b'\x00' + rnd.randbytes(width * 3) for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n' +
+            chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)) +
+            chunk(b'IDAT', zlib.compress(rows, 1)) +
+            chunk(b'IEND', b''))
+
+def _elf(rnd: random.Random, size: int) -> bytes:
+    header = (b'\x7FELF' + bytes([2, 1, 1, 9]) + bytes(8) +
+              struct.pack('<HHIQQQIHHHHHH', 2, 0x3E, 1, 0x400000, 0x40, 0, 0, 0x40, 0x38, 1, 0x40, 0, 0))
+    return header + _text_like(rnd, size // 2) + rnd.randbytes(size - len(header) - size // 2)
+
+def _payloads(rnd: random.Random) -> List[bytes]:
+    """One payload of each kind, reused across the file"""
+    return [
+        _lzma_stream(rnd, 0x40000),      # 256KB of text in an LZMA stream
+        _png(rnd, 96, 96),
+        _elf(rnd, 0x8000),
+        _lzma_stream(rnd, 0x100000),     # 1MB of text in an LZMA stream
+        None                             # high-entropy region, generated each time
+    ]
+
+def write_pup(f, base: int, size: int, seed: int = 0, fill_ratio: float = 0.25) -> None:
+    """Write a synthetic PS4 PUP of the given size at offset base of an open file"""
+    rnd = random.Random(seed)
+    header = PS4_MAGIC + struct.pack('>HHHHHH', 1, 0, 0, 0, 0x20, 0)
+    f.seek(base)
+    f.write(header + rnd.randbytes(0x20 - len(header)))
+
+    payloads = _payloads(rnd)
+    entropy_size = 0x100000
+    average = (sum(len(p) for p in payloads if p) + entropy_size) / len(payloads)
+    count = max(1, int(size * fill_ratio / average))
+    stride = (size - 0x20) // count
+
+    for i in range(count):
+        payload = payloads[i % len(payloads)]
+        if payload is None:
+            payload = rnd.randbytes(entropy_size)
+        # Unaligned offsets, like payloads carved from a real dump
+        offset = 0x20 + i * stride + rnd.randrange(0, 0x1000)
+        payload = payload[:max(0, size - offset)]
+        f.seek(base + offset)
+        f.write(payload)
+
+    # Extend the file to its full size, the gaps stay sparse
+    f.truncate(max(f.seek(0, os.SEEK_END), base + size))
+
+def generate_pup(path: str, size: int, seed: int = 0, fill_ratio: float = 0.25) -> str:
+    """Create a synthetic PUP file, unless an identical one already exists"""
+    if os.path.exists(path) and os.path.getsize(path) == size:
+        return path
+    with open(path, 'wb') as f:
+        write_pup(f, 0, size, seed, fill_ratio)
+    return path
+
+def generate_slb2(path: str, entry_sizes: List[int], seed: int = 0, fill_ratio: float = 0.25) -> str:
+    """Create a synthetic SLB2 container holding one synthetic PUP per entry"""
+    header = bytearray(0x200)
+    sector = 1
+    entries = []
+    for i, entry_size in enumerate(entry_sizes):
+        entries.append((sector, entry_size, f"PS4UPDATE{i + 1}.PUP"))
+        sector += -(-entry_size // SECTOR_SIZE)
+
+    total_size = sector * SECTOR_SIZE
+    if os.path.exists(path) and os.path.getsize(path) == total_size:
+        return path
+
+    struct.pack_into('<4sIIII', header, 0, SLB2_MAGIC, 1, 0, len(entries), sector)
+    for i, (start_sector, entry_size, name) in enumerate(entries):
+        struct.pack_into('<II8x32s', header, 0x20 + i * 0x30, start_sector, entry_size, name.encode())
+
+    with open(path, 'wb') as f:
+        f.write(header)
+        for i, (start_sector, entry_size, _) in enumerate(entries):
+            write_pup(f, start_sector * SECTOR_SIZE, entry_size, seed + i, fill_ratio)
+        f.truncate(total_size)
+    return path
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic PUP/SLB2 files")
+    parser.add_argument("kind", choices=["pup", "slb2"])
+    parser.add_argument("path")
+    parser.add_argument("size", help="file size (PUP) or size of each entry (SLB2), e.g. 64M or 2G")
+    parser.add_argument("--entries", type=int, default=3, help="entries of the SLB2 container")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fill-ratio", type=float, default=0.25, help="fraction of the file holding payloads")
+    args = parser.parse_args(argv)
+
+    size = parse_size(args.size)
+    if args.kind == "pup":
+        generate_pup(args.path, size, args.seed, args.fill_ratio)
+    else:
+        generate_slb2(args.path, [size] * args.entries, args.seed, args.fill_ratio)
+    print(args.path)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Benchmarks of the PUP/SLB2 loaders on a synthetic corpus.
+
+Each benchmark runs in its own process, so that the peak RSS it reports
+belongs to that benchmark alone. Results (wall time, throughput and peak
+RSS) are printed as a table and written to a JSON file, which can be
+compared with the results of an earlier run:
+
+    python benchmarks/run_benchmarks.py --sizes 64M,1G -o after.json --compare before.json
+
+Peak RSS includes the pages of the mapped file that were read, which is
+what the operating system charges to the process.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from corpus import generate_pup, generate_slb2, parse_size
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+DEFAULT_CORPUS_DIR = os.path.join(BENCH_DIR, 'corpus')
+
+def peak_rss() -> Optional[int]:
+    """Peak resident set size of this process in bytes, None where unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def bench_pup_load(path: str, options: Dict) -> int:
+    from core.pup_file import Pup
+    pup = Pup(path)
+    if not pup.load():
+        raise RuntimeError("load failed")
+    pup.close()
+    return os.path.getsize(path)
+
+def bench_pup_scan(path: str, options: Dict) -> int:
+    from core.mapped_file import MappedFile
+    from core.segment_probe import SIGNATURES
+    from core.signature_scanner import SignatureScanner
+    with MappedFile(path) as source:
+        for _ in SignatureScanner(SIGNATURES).scan(source, 0, len(source)):
+            pass
+    return os.path.getsize(path)
+
+def bench_pup_analyze(path: str, options: Dict) -> int:
+    from core.mapped_file import MappedFile
+    from crypto.pup_analyzer import PupAnalyzer
+    # Analyzed in place over the mapping with merged ranges, like the CLI
+    with MappedFile(path) as source:
+        limit = min(options['analyze_limit'] or len(source), len(source))
+        PupAnalyzer().analyze_source(source, 0, limit, compact=True)
+        return limit
+
+def bench_pup_extract(path: str, options: Dict) -> int:
+    from core.pup_file import Pup
+    output_dir = tempfile.mkdtemp(prefix='pfu-bench-')
+    try:
+        with Pup(path) as pup:
+            if not pup.load():
+                raise RuntimeError("load failed")
+            files = pup.extract_all(output_dir, workers=options['workers'])
+        return sum(os.path.getsize(f) for f in files)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+def bench_slb2_load(path: str, options: Dict) -> int:
+    from core.slb2_file import SLB2File
+    if not SLB2File(path).load():
+        raise RuntimeError("load failed")
+    return os.path.getsize(path)
+
+def bench_slb2_extract(path: str, options: Dict) -> int:
+    from core.slb2_file import SLB2File
+    output_dir = tempfile.mkdtemp(prefix='pfu-bench-')
+    try:
+        slb2 = SLB2File(path)
+        if not slb2.load():
+            raise RuntimeError("load failed")
+        files = slb2.extract_all(output_dir, workers=options['workers'])
+        return sum(os.path.getsize(f) for f in files)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+# name -> (corpus kind, function returning the bytes processed)
+BENCHMARKS: Dict[str, tuple] = {
+    'pup_load': ('pup', bench_pup_load),
+    'pup_scan': ('pup', bench_pup_scan),
+    'pup_analyze': ('pup', bench_pup_analyze),
+    'pup_extract': ('pup', bench_pup_extract),
+    'slb2_load': ('slb2', bench_slb2_load),
+    'slb2_extract': ('slb2', bench_slb2_extract)
+}
+
+def run_child(name: str, path: str, options: Dict) -> Dict:
+    """Run one benchmark in this process (called in the child)"""
+    sys.path.insert(0, SRC_DIR)
+    function: Callable = BENCHMARKS[name][1]
+
+    # The core modules report their progress with print()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        processed = function(path, options)
+        wall = time.perf_counter() - start
+
+    return {'wall_s': wall, 'bytes': processed, 'peak_rss': peak_rss()}
+
+def run_benchmark(name: str, path: str, options: Dict) -> Dict:
+    """Run one benchmark in a fresh process and return its result"""
+    command = [sys.executable, os.path.abspath(__file__), '--child', name, path, json.dumps(options)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+
+    result = {'benchmark': name, 'file': os.path.basename(path), 'file_size': os.path.getsize(path)}
+    if completed.returncode != 0:
+        result['error'] = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"
+        return result
+
+    measures = json.loads(completed.stdout.strip().splitlines()[-1])
+    result.update(measures)
+    result['mb_per_s'] = measures['bytes'] / (1 << 20) / measures['wall_s'] if measures['wall_s'] else None
+    return result
+
+def build_corpus(corpus_dir: str, sizes: List[int], seed: int, slb2_entries: int) -> Dict[str, List[str]]:
+    """Generate (or reuse) the corpus files, grouped by kind"""
+    os.makedirs(corpus_dir, exist_ok=True)
+    corpus = {'pup': [], 'slb2': []}
+    for size in sizes:
+        corpus['pup'].append(generate_pup(os.path.join(corpus_dir, f"synthetic_{size}_{seed}.pup"), size, seed))
+        # SLB2 entry sizes are 32-bit: split the size among the entries
+        entry_size = min(size // slb2_entries, 0xFFFFFE00)
+        corpus['slb2'].append(generate_slb2(os.path.join(corpus_dir, f"synthetic_{size}_{seed}.slb2"),
+                                            [entry_size] * slb2_entries, seed))
+    return corpus
+
+def format_size(size: int) -> str:
+    for unit, scale in (('G', 1 << 30), ('M', 1 << 20), ('K', 1 << 10)):
+        if size >= scale:
+            return f"{size / scale:g}{unit}"
+    return str(size)
+
+def print_table(results: List[Dict], baseline: Optional[Dict] = None) -> None:
+    print(f"{'benchmark':<14}{'size':>8}{'wall (s)':>11}{'MB/s':>10}{'peak RSS (MB)':>15}"
+          + (f"{'vs baseline':>13}" if baseline else ""))
+    for result in results:
+        if 'error' in result:
+            print(f"{result['benchmark']:<14}{format_size(result['file_size']):>8}  error: {result['error']}")
+            continue
+
+        rss = f"{result['peak_rss'] / (1 << 20):.1f}" if result['peak_rss'] else "n/a"
+        line = (f"{result['benchmark']:<14}{format_size(result['file_size']):>8}"
+                f"{result['wall_s']:>11.3f}{result['mb_per_s'] or 0:>10.1f}{rss:>15}")
+        if baseline:
+            previous = baseline.get((result['benchmark'], result['file']))
+            if previous and previous.get('wall_s'):
+                line += f"{previous['wall_s'] / result['wall_s']:>12.2f}x"
+        print(line)
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == '--child':
+        name, path, options = argv[1], argv[2], json.loads(argv[3])
+        print(json.dumps(run_child(name, path, options)))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Benchmark the PUP/SLB2 loaders on a synthetic corpus")
+    parser.add_argument("--sizes", default="16M,256M", help="comma separated file sizes, e.g. 64M,1G,4G")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help="comma separated benchmarks to run")
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR, help="where the synthetic files are kept")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the corpus generator")
+    parser.add_argument("--slb2-entries", type=int, default=3, help="PUP entries in each SLB2 file")
+    parser.add_argument("--analyze-limit", type=parse_size, default=0,
+                        help="bytes read by pup_analyze from the start of each PUP (default: the whole file)")
+    parser.add_argument("--workers", type=int, default=None, help="extraction threads (default: one per core)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs of each benchmark, the fastest is kept")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.benchmarks.split(",") if name.strip()]
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    print(f"Generating the corpus in {args.corpus_dir}...")
+    corpus = build_corpus(args.corpus_dir, sizes, args.seed, args.slb2_entries)
+    options = {'analyze_limit': args.analyze_limit, 'workers': args.workers}
+
+    results = []
+    for name in names:
+        for path in corpus[BENCHMARKS[name][0]]:
+            runs = [run_benchmark(name, path, options) for _ in range(max(1, args.repeat))]
+            valid = [run for run in runs if 'error' not in run]
+            results.append(min(valid, key=lambda run: run['wall_s']) if valid else runs[0])
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = {(r['benchmark'], r['file']): r for r in json.load(f)['results']}
+    print_table(results, baseline)
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    return 1 if any('error' in result for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
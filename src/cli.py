@@ -0,0 +1,275 @@
+"""
+Headless command-line interface for PFU.
+
+Only the core modules are imported (never PyQt6), so the unpacker can run
+on servers and be started many times from a job scheduler.
+
+    python cli.py info FIRMWARE.PUP
+    python cli.py list --json PS4UPDATE.PUP
+    python cli.py extract -o out/ --workers 8 PS4UPDATE.PUP
+    python cli.py analyze --batch files.txt --json
+    python cli.py unpack -o out/ PS4UPDATE.slb2
+    python cli.py entropy --threshold 7.5 --range 0x1000:0x200000 PS4UPDATE.PUP
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, Iterator, List, Optional
+
+from core.pup_file import Pup
+from core.slb2_file import SLB2File
+
+def detect_type(file_path: str) -> Optional[str]:
+    """Return 'PUP' or 'SLB2' from the magic of the file, or None"""
+    with open(file_path, 'rb') as f:
+        magic = f.read(4)
+
+    if magic == SLB2File.MAGIC:
+        return "SLB2"
+    if magic in [Pup.PS4_MAGIC, Pup.PS5_MAGIC, Pup.PS3_MAGIC]:
+        return "PUP"
+    return None
+
+def open_container(file_path: str, args):
+    """Create and load the PUP or SLB2 object for a file"""
+    file_type = detect_type(file_path)
+    if file_type == "SLB2":
+        container = SLB2File(file_path)
+    elif file_type == "PUP":
+        scan_index = None
+        if not args.no_index:
+            from core.scan_index import ScanIndex
+            scan_index = ScanIndex(args.cache_dir)
+        container = Pup(file_path, scan_workers=args.scan_workers, scan_index=scan_index)
+    else:
+        raise ValueError("File type not recognized")
+
+    if not container.load():
+        # The PUP maps the file while it loads
+        if file_type == "PUP":
+            container.close()
+        raise ValueError(f"Unable to load {file_type} file")
+    return file_type, container
+
+def command_info(file_path: str, args) -> Dict:
+    file_type, container = open_container(file_path, args)
+    info = container.get_info()
+    if file_type == "PUP":
+        info.pop('segments')
+        container.close()
+    else:
+        info.pop('entries')
+    info['type'] = file_type
+    return info
+
+def command_list(file_path: str, args) -> Dict:
+    file_type, container = open_container(file_path, args)
+    info = container.get_info()
+    if file_type == "PUP":
+        container.close()
+        return {'type': file_type, 'items': info['segments']}
+    return {'type': file_type, 'items': info['entries']}
+
+def command_extract(file_path: str, args) -> Dict:
+    file_type, container = open_container(file_path, args)
+    output_dir = args.output or os.path.splitext(file_path)[0]
+    if args.output and (args.batch or len(args.files) > 1):
+        # Keep the files of a batch apart
+        output_dir = os.path.join(args.output, os.path.splitext(os.path.basename(file_path))[0])
+
+    if file_type == "PUP":
+        with container:
+            extracted_files = container.extract_all(output_dir, workers=args.workers)
+        return {'type': file_type, 'output_dir': output_dir, 'extracted': sorted(extracted_files)}
+
+    # Entries are hashed while they are copied, no second read of the outputs
+    manifest = container.extract_manifest(output_dir, workers=args.workers, digests=args.digest or ['sha256'])
+    return {'type': file_type, 'output_dir': output_dir,
+            'extracted': sorted(record['path'] for record in manifest), 'manifest': manifest}
+
+def command_analyze(file_path: str, args) -> Dict:
+    # The analyzer is only needed by this command
+    from core.mapped_file import MappedFile
+    from crypto.pup_analyzer import PupAnalyzer
+
+    with MappedFile(file_path) as source:
+        # High entropy blocks as merged ranges, not one dict per block
+        analysis = PupAnalyzer().analyze_source(source, 0, args.limit, compact=True)
+        bytes_analyzed = min(args.limit, len(source))
+
+    header = analysis['header']
+    if 'magic' in header:
+        header['magic'] = header['magic'].hex()
+    encryption = analysis['encryption']
+    encrypted_blocks = sum(end - start for start, end in encryption['encrypted_ranges']) // 16
+    return {
+        'bytes_analyzed': bytes_analyzed,
+        'header': header,
+        'encryption_suspected': encryption['suspected'],
+        # Names of the detectors that fired ('high_entropy', 'repeating_patterns')
+        'encryption_patterns': encryption['patterns'],
+        'encrypted_blocks': encrypted_blocks,
+        'encrypted_ranges': encryption['encrypted_ranges'],
+        'patterns': sum(pattern['size'] // 16 if pattern['type'] == 'potential_key_range' else 1
+                        for pattern in analysis['patterns']),
+        'suspected_keys': analysis['suspected_keys'][:args.top_keys]
+    }
+
+def command_unpack(file_path: str, args) -> Dict:
+    # Nested containers are parsed in place, only the leaves are written (with -o)
+    from core.unpack import NestedUnpacker
+
+    output_dir = args.output
+    if output_dir and (args.batch or len(args.files) > 1):
+        output_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(file_path))[0])
+    index = NestedUnpacker(args.max_depth, output_dir, verbose=args.verbose).unpack(file_path)
+    return {'output_dir': output_dir, 'items': index}
+
+def parse_range(text: str):
+    start, _, end = text.partition(':')
+    try:
+        return int(start, 0), int(end, 0)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid range {text!r}, use START:END")
+
+def command_entropy(file_path: str, args) -> Dict:
+    # The profile is built once and cached in <file>.entropy.npz, later queries only read it
+    from crypto.entropy_profile import EntropyProfile
+
+    profile = EntropyProfile.for_file(file_path, use_cache=not args.no_cache)
+    if profile is None:
+        raise RuntimeError("unable to compute the entropy profile")
+    with profile:
+        level = profile.level(args.block_size)
+        result = {
+            'size': profile.size,
+            'entropy': round(profile.range_entropy(0, profile.size), 4),
+            'block_size': args.block_size,
+            'blocks': len(level),
+            'max_entropy': round(float(level.max()), 4) if len(level) else 0.0,
+            'mean_entropy': round(float(level.mean()), 4) if len(level) else 0.0
+        }
+        if args.threshold is not None:
+            result['ranges'] = [{'start': start, 'end': end}
+                                for start, end in profile.ranges_above(args.threshold, args.block_size)]
+        if args.range:
+            result['range_entropy'] = [{'start': start, 'end': end, 'entropy': round(profile.range_entropy(start, end), 4)}
+                                       for start, end in args.range]
+        if args.width:
+            block_size, values = profile.map(args.width)
+            result['map_block_size'] = block_size
+            result['map'] = [round(float(value), 3) for value in values]
+    return result
+
+COMMANDS = {
+    'info': command_info,
+    'list': command_list,
+    'extract': command_extract,
+    'analyze': command_analyze,
+    'unpack': command_unpack,
+    'entropy': command_entropy
+}
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pfu", description="PUP/SLB2 file unpacker (headless)")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("files", nargs="*", help="PUP or SLB2 files")
+    common.add_argument("--batch", metavar="LIST", help="read more file paths from LIST, one per line ('-' for stdin)")
+    common.add_argument("--json", action="store_true", help="print one JSON object per file (JSON Lines)")
+    common.add_argument("-v", "--verbose", action="store_true", help="show the loader messages on stderr")
+    common.add_argument("--scan-workers", type=int, default=1, help="processes used to scan large PUP files")
+    common.add_argument("--no-index", action="store_true", help="do not use the scan index")
+    common.add_argument("--cache-dir", help="directory of the scan index")
+    common.add_argument("--metrics", metavar="FILE", help="write the time spent in each phase and the counters as JSON")
+    common.add_argument("--trace", metavar="FILE", help="write the phases as a Chrome trace (chrome://tracing, Perfetto)")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("info", parents=[common], help="show the header information")
+    commands.add_parser("list", parents=[common], help="list the segments or entries")
+    extract = commands.add_parser("extract", parents=[common], help="extract all segments or entries")
+    extract.add_argument("-o", "--output", help="output directory (default: next to the file)")
+    extract.add_argument("--workers", type=int, default=None, help="extraction threads (default: one per core)")
+    extract.add_argument("--digest", action="append", choices=sorted(hashlib.algorithms_guaranteed),
+                         help="digest of the extracted SLB2 entries in the manifest, repeatable (default: sha256)")
+    analyze = commands.add_parser("analyze", parents=[common], help="look for encryption patterns and keys")
+    analyze.add_argument("--limit", type=int, default=0x100000, help="bytes analyzed from the start of the file")
+    analyze.add_argument("--top-keys", type=int, default=10, help="suspected keys reported")
+    unpack = commands.add_parser("unpack", parents=[common], help="index nested containers (PUP in SLB2...) in one pass")
+    unpack.add_argument("-o", "--output", help="also write the items found to this directory")
+    unpack.add_argument("--max-depth", type=int, default=8, help="maximum nesting level walked")
+    entropy = commands.add_parser("entropy", parents=[common], help="entropy map of the whole file (cached profile)")
+    entropy.add_argument("--block-size", type=lambda x: int(x, 0), default=0x10000, choices=(16, 0x1000, 0x10000, 0x100000),
+                         help="block size of the statistics and of --threshold (16, 4096, 65536, 1048576)")
+    entropy.add_argument("--threshold", type=float, help="report the ranges with an entropy above this (bits/byte)")
+    entropy.add_argument("--range", action="append", type=parse_range, metavar="START:END",
+                         help="entropy of a byte range, repeatable (decimal or 0x hex)")
+    entropy.add_argument("--width", type=int, help="entropy map with this many columns (maximum of each column)")
+    entropy.add_argument("--no-cache", action="store_true", help="rebuild the profile and do not save it")
+    return parser
+
+def iter_files(args) -> Iterator[str]:
+    yield from args.files
+    if args.batch:
+        with (sys.stdin if args.batch == '-' else open(args.batch)) as f:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+
+def print_result(result: Dict) -> None:
+    """Human readable output"""
+    print(result['file'])
+    if 'error' in result:
+        print(f"  Error: {result['error']}")
+        return
+
+    for key, value in result.items():
+        if key == 'file':
+            continue
+        if isinstance(value, list):
+            print(f"  {key}: {len(value)}")
+            for item in value:
+                print(f"    {item}")
+        else:
+            print(f"  {key}: {value}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    command = COMMANDS[args.command]
+    failures = 0
+
+    instrumentation = None
+    if args.metrics or args.trace:
+        from utils import instrumentation as instrumentation_module
+        instrumentation = instrumentation_module.enable()
+
+    # The core modules report their progress with print(): keep stdout for the results
+    with open(os.devnull, 'w') as devnull:
+        log = sys.stderr if args.verbose else devnull
+
+        for file_path in iter_files(args):
+            result = {'file': file_path, 'command': args.command}
+            try:
+                with contextlib.redirect_stdout(log):
+                    result.update(command(file_path, args))
+            except Exception as e:
+                result['error'] = str(e)
+                failures += 1
+
+            if args.json:
+                print(json.dumps(result), flush=True)
+            else:
+                print_result(result)
+
+    if instrumentation:
+        if args.metrics:
+            instrumentation.dump(args.metrics, 'json')
+        if args.trace:
+            instrumentation.dump(args.trace, 'chrome')
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,8 @@
 import struct
 from typing import Dict, List, Optional, Tuple
-from cryptography import x509
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import padding, rsa, ec
-from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
-from cryptography.exceptions import InvalidSignature
+
+# cryptography is imported by the methods that use it: loading it takes
+# longer than the rest of the application
 
 class CertAnalyzer:
     def __init__(self):
@@ -14,6 +12,8 @@ class CertAnalyzer:
         
     def analyze_certificate(self, cert_data: bytes) -> Dict:
         """Analyze a certificate and extract its information"""
+        from cryptography import x509
+        
         try:
             cert = x509.load_pem_x509_certificate(cert_data)
             
@@ -45,6 +45,8 @@ class CertAnalyzer:
             
     def analyze_private_key(self, key_data: bytes) -> Dict:
         """Analyze a private key and extract its information"""
+        from cryptography.hazmat.primitives.serialization import load_pem_private_key
+        
         try:
             key = load_pem_private_key(key_data, password=None)
             
@@ -61,6 +63,8 @@ class CertAnalyzer:
             
     def analyze_public_key(self, key_data: bytes) -> Dict:
         """Analyze a public key and extract its information"""
+        from cryptography.hazmat.primitives.serialization import load_pem_public_key
+        
         try:
             key = load_pem_public_key(key_data)
             
@@ -77,6 +81,11 @@ class CertAnalyzer:
             
     def verify_signature(self, data: bytes, signature: bytes, public_key: bytes) -> bool:
         """Verify a digital signature"""
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding, rsa, ec
+        from cryptography.hazmat.primitives.serialization import load_pem_public_key
+        
         try:
             key = load_pem_public_key(public_key)
             
@@ -105,6 +114,8 @@ class CertAnalyzer:
             
     def get_certificate_chain(self, cert_data: bytes) -> List[Dict]:
         """Build the certificate chain"""
+        from cryptography import x509
+        
         try:
             cert = x509.load_pem_x509_certificate(cert_data)
             chain = []
@@ -64,6 +64,17 @@ class ElfAnalyzer:
         except Exception as e:
             return {'valid': False, 'error': str(e)}
             
+    def analyze_source(self, source, offset: int = 0, length: Optional[int] = None) -> Dict:
+        """
+        Analyze an ELF stored in the range [offset, offset + length) of a
+        source (MappedFile, SourceSlice of a container, bytes), e.g. a PUP
+        segment, without extracting it first: the headers are parsed and
+        the patterns searched on a view of the range, not on a copy.
+        """
+        end = None if length is None else offset + length
+        view = source.view(offset, end) if hasattr(source, 'view') else memoryview(source)[offset:end]
+        return self.analyze_elf(view)
+        
     def _is_valid_elf(self, data: bytes) -> bool:
         """Verify if the data contains a valid ELF file"""
         return len(data) >= 4 and data[:4] == b'\x7fELF'
@@ -71,7 +82,7 @@ class ElfAnalyzer:
     def _parse_elf_header(self, data: bytes) -> None:
         """Analyze the ELF header"""
         self.elf_header = {
-            'magic': data[:4],
+            'magic': bytes(data[:4]),
             'class': data[4],
             'data': data[5],
             'version': data[6],
@@ -145,21 +156,27 @@ class ElfAnalyzer:
                     'value': match.group()
                 })
                 
+    @staticmethod
+    def _find(data, pattern: bytes, start: int) -> int:
+        """data.find(pattern, start), also for the memoryviews of analyze_source"""
+        match = re.compile(re.escape(pattern)).search(data, start)
+        return match.start() if match else -1
+        
     def _search_certificates(self, data: bytes) -> None:
         """Search for certificates in the data"""
         for pattern in self.CERT_PATTERNS:
             start = 0
             while True:
-                start = data.find(pattern, start)
+                start = self._find(data, pattern, start)
                 if start == -1:
                     break
                     
                 # Search for the end of the certificate
                 end_pattern = pattern.replace(b'BEGIN', b'END')
-                end = data.find(end_pattern, start)
+                end = self._find(data, end_pattern, start)
                 if end != -1:
                     end += len(end_pattern)
-                    cert_data = data[start:end]
+                    cert_data = bytes(data[start:end])
                     self.found_certs.append({
                         'type': pattern.decode(),
                         'offset': start,
@@ -0,0 +1,91 @@
+import lzma
+from typing import Iterator, Optional, Tuple
+from utils.instrumentation import count, span
+
+# LZMA streams start with 5D 00 00 (lc=3, lp=0, pb=2 and a small dictionary)
+LZMA_SIGNATURE = b'\x5D\x00\x00'
+
+# Input fed to the decompressor before trusting a candidate stream
+PROBE_SIZE = 0x1000  # 4KB
+# Input fed at each step once the stream looks valid
+CHUNK_SIZE = 0x10000  # 64KB
+# Maximum output produced at each step, the output itself is discarded
+OUTPUT_LIMIT = 0x100000  # 1MB
+# Largest stream followed by a probe, a false candidate that keeps decoding
+# is dropped once it goes past either limit
+MAX_PROBE_INPUT = 0x10000000  # 256MB
+MAX_PROBE_OUTPUT = 0x40000000  # 1GB
+
+def probe_lzma_stream(data: memoryview, offset: int = 0,
+                      probe_size: int = PROBE_SIZE,
+                      chunk_size: int = CHUNK_SIZE,
+                      max_input: int = MAX_PROBE_INPUT,
+                      max_output: int = MAX_PROBE_OUTPUT) -> Optional[Tuple[int, int]]:
+    """
+    Follow the LZMA stream starting at offset up to its end-of-stream marker.
+
+    Returns (compressed_size, uncompressed_size) with the exact number of
+    input bytes consumed, or None if the data is not a complete valid stream.
+    Only the first probe_size bytes are fed before the decoder has to accept
+    them, so invalid candidates are rejected after a few KB. A stream longer
+    than max_input compressed bytes or max_output decompressed bytes is not
+    followed further and gives None.
+    """
+    decompressor = lzma.LZMADecompressor()
+    end = len(data)
+    position = offset
+    step = probe_size
+    uncompressed_size = 0
+
+    try:
+        while not decompressor.eof:
+            if decompressor.needs_input:
+                if position >= end:
+                    # The stream is truncated
+                    return None
+                if position - offset >= max_input:
+                    return None
+                chunk = data[position:min(position + step, offset + max_input)]
+                position += len(chunk)
+                step = chunk_size
+            else:
+                # Drain the pending output before feeding more input
+                chunk = b''
+            uncompressed_size += len(decompressor.decompress(chunk, OUTPUT_LIMIT))
+            if uncompressed_size > max_output:
+                return None
+    except lzma.LZMAError:
+        return None
+
+    compressed_size = position - offset - len(decompressor.unused_data)
+    return compressed_size, uncompressed_size
+
+def iter_lzma_decompress(data: memoryview, offset: int, size: int,
+                         chunk_size: int = CHUNK_SIZE,
+                         output_limit: int = OUTPUT_LIMIT) -> Iterator[bytes]:
+    """
+    Decompress the LZMA stream in data[offset:offset + size] chunk by chunk.
+
+    At most chunk_size input bytes and output_limit output bytes are held at
+    any time, whatever the size of the stream. Raises lzma.LZMAError if the
+    stream is invalid or truncated.
+    """
+    decompressor = lzma.LZMADecompressor()
+    position = offset
+    end = offset + size
+
+    while not decompressor.eof:
+        if decompressor.needs_input:
+            if position >= end:
+                raise lzma.LZMAError("Compressed data ended before the end-of-stream marker")
+            chunk = data[position:min(position + chunk_size, end)]
+            position += len(chunk)
+        else:
+            # Drain the pending output before feeding more input
+            chunk = b''
+
+        with span('decompress'):
+            output = decompressor.decompress(chunk, output_limit)
+        if output:
+            count('bytes_decompressed', len(output))
+            yield output
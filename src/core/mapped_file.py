@@ -0,0 +1,147 @@
+import mmap
+import os
+from typing import Optional, Union
+
+class MappedFile:
+    """
+    Read-only memory-mapped access to a file.
+
+    The file is never read as a whole: slices of `data` are views on the
+    mapping, so only the pages that are actually touched get loaded.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.size = 0
+        self.data: Optional[memoryview] = None
+        self._file = None
+        self._mmap: Optional[Union[mmap.mmap, bytes]] = None
+
+    def open(self) -> bool:
+        """Map the file in memory (read-only)"""
+        self._file = open(self.file_path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+
+        if self.size == 0:
+            # An empty file cannot be mapped
+            self._mmap = b''
+        else:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.data = memoryview(self._mmap)
+        return True
+
+    def view(self, start: int, end: Optional[int] = None) -> memoryview:
+        """Return a zero-copy view of the range [start, end)"""
+        if end is None or end > self.size:
+            end = self.size
+        return self.data[start:end]
+
+    def find(self, sub: bytes, start: int = 0, end: Optional[int] = None) -> int:
+        """Search a byte sequence without copying the mapped data"""
+        if end is None or end > self.size:
+            end = self.size
+        return self._mmap.find(sub, start, end)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def slice(self, offset: int, length: Optional[int] = None) -> 'SourceSlice':
+        """Return a zero-copy source over [offset, offset + length) of the file"""
+        return SourceSlice(self, offset, length)
+
+    def close(self) -> None:
+        """Release the mapping and the file handle"""
+        if self.data is not None:
+            try:
+                self.data.release()
+            except BufferError:
+                # Some views are still alive, the mapping is freed with them
+                pass
+            self.data = None
+
+        if isinstance(self._mmap, mmap.mmap):
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass
+        self._mmap = None
+
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class SourceSlice:
+    """
+    Zero-copy window [offset, offset + length) over another source: a
+    MappedFile, another SourceSlice or an in-memory buffer (bytes, e.g. a
+    decompressed segment).
+
+    It offers the same interface as MappedFile (data, view, find, len,
+    slice), with positions relative to the start of the window, so that
+    containers nested in a file are parsed in place. file_path and
+    file_offset locate the window in the file on disk; file_offset is None
+    when the data only exists in memory. Closing a slice never closes the
+    source it was taken from.
+    """
+
+    def __init__(self, source, offset: int = 0, length: Optional[int] = None):
+        source_size = len(source)
+        if offset < 0 or offset > source_size:
+            raise ValueError(f"Slice offset {offset} out of the source ({source_size} bytes)")
+        if length is None or offset + length > source_size:
+            length = source_size - offset
+
+        self.offset = offset
+        self.size = length
+        self._source = source
+        self.file_path: Optional[str] = getattr(source, 'file_path', None)
+        if isinstance(source, (MappedFile, SourceSlice)):
+            parent_offset = source.file_offset if isinstance(source, SourceSlice) else 0
+            self.file_offset = parent_offset + offset if parent_offset is not None else None
+            self.data: Optional[memoryview] = source.view(offset, offset + length)
+        else:
+            self.file_offset = None
+            self.data = memoryview(source)[offset:offset + length]
+
+    def view(self, start: int, end: Optional[int] = None) -> memoryview:
+        """Return a zero-copy view of the range [start, end) of the slice"""
+        if end is None or end > self.size:
+            end = self.size
+        return self.data[start:end]
+
+    def find(self, sub: bytes, start: int = 0, end: Optional[int] = None) -> int:
+        """Search a byte sequence in the slice, using the search of the source"""
+        if end is None or end > self.size:
+            end = self.size
+        position = self._source.find(sub, self.offset + start, self.offset + end)
+        return position - self.offset if position != -1 else -1
+
+    def __len__(self) -> int:
+        return self.size
+
+    def slice(self, offset: int, length: Optional[int] = None) -> 'SourceSlice':
+        """Return a zero-copy source over [offset, offset + length) of the slice"""
+        return SourceSlice(self, offset, length)
+
+    def close(self) -> None:
+        """Release the view, the source stays open"""
+        if self.data is not None:
+            try:
+                self.data.release()
+            except BufferError:
+                pass
+            self.data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
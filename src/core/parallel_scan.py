@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+from core.mapped_file import MappedFile
+from core.progress import CancelToken, OperationCancelled, ProgressCallback, check_cancelled
+from core.segment_probe import SIGNATURES, probe_segment
+from core.signature_scanner import SignatureScanner
+
+# Smallest chunk handed to a worker process
+MIN_CHUNK_SIZE = 0x1000000  # 16MB
+# Chunks per worker, so that a slow chunk does not stall the whole scan
+CHUNKS_PER_WORKER = 4
+# Interval between two checks of the cancel token while the chunks run
+POLL_INTERVAL = 0.1
+
+# (offset, kind, segment or None, probed): probed is False for the
+# candidates the worker skipped because they are inside a segment it found
+Candidate = Tuple[int, str, Optional[Dict], bool]
+
+def _scan_chunk(file_path: str, start: int, end: int, base_offset: int = 0,
+                length: Optional[int] = None) -> List[Candidate]:
+    """
+    Worker: find the candidates starting in [start, end) and validate them.
+
+    The file is mapped again in the worker, so all processes share the same
+    page cache. Signatures and streams may extend past end: the scanner
+    overlaps the next chunk by the longest signature and the validation
+    reads the whole mapping. Offsets are relative to the slice
+    [base_offset, base_offset + length) of the file.
+
+    Like the sequential scan, the candidates inside a segment found in this
+    chunk are not probed. The worker does not know the segments of the
+    previous chunks, so it may still probe candidates that the merge drops.
+    """
+    candidates: List[Candidate] = []
+    next_offset = start
+    with MappedFile(file_path) as mapped, mapped.slice(base_offset, length) as source:
+        scanner = SignatureScanner(SIGNATURES)
+        for offset, kind in scanner.scan(source, start, end):
+            if offset < next_offset:
+                candidates.append((offset, kind, None, False))
+                continue
+            try:
+                segment = probe_segment(source.data, source, offset, kind, verbose=False)
+            except Exception:
+                # Same outcome as an invalid candidate in the sequential scan
+                segment = None
+            if segment:
+                next_offset = offset + segment['compressed_size']
+            candidates.append((offset, kind, segment, True))
+    return candidates
+
+def parallel_scan(file_path: str, start: int, end: int, workers: Optional[int] = None,
+                  base_offset: int = 0, length: Optional[int] = None,
+                  progress: Optional[ProgressCallback] = None,
+                  cancel: Optional[CancelToken] = None) -> List[Candidate]:
+    """
+    Scan and validate [start, end) of a file, or of the slice of length
+    bytes at base_offset (e.g. a PUP inside an SLB2), on a pool of worker
+    processes.
+
+    Returns every candidate as (offset, kind, segment or None, probed) in
+    offset order, exactly as a sequential scan would see them. Each chunk
+    only reports the candidates that start inside it, so the overlap at the
+    chunk boundaries never produces duplicates. progress(done, total)
+    reports the bytes of the chunks completed; once cancel is cancelled the
+    pending chunks are dropped and OperationCancelled is raised.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(MIN_CHUNK_SIZE, -(-(end - start) // (workers * CHUNKS_PER_WORKER)))
+    bounds = [(chunk_start, min(chunk_start + chunk_size, end))
+              for chunk_start in range(start, end, chunk_size)]
+
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(bounds) or 1))
+    cancelled = False
+    try:
+        futures = [executor.submit(_scan_chunk, file_path, chunk_start, chunk_end, base_offset, length)
+                   for chunk_start, chunk_end in bounds]
+        sizes = {future: chunk_end - chunk_start for future, (chunk_start, chunk_end) in zip(futures, bounds)}
+        pending = set(futures)
+        done_bytes = 0
+        while pending:
+            check_cancelled(cancel)
+            completed, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in completed:
+                done_bytes += sizes[future]
+            if completed and progress:
+                progress(done_bytes, end - start)
+
+        # Merged in chunk order, so the list stays sorted
+        candidates: List[Candidate] = []
+        for future in futures:
+            candidates.extend(future.result())
+        return candidates
+    except OperationCancelled:
+        cancelled = True
+        raise
+    finally:
+        # On cancellation do not wait for the chunks already running
+        executor.shutdown(wait=not cancelled, cancel_futures=True)
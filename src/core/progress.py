@@ -0,0 +1,62 @@
+import threading
+from typing import Callable, Optional
+
+# progress(done, total): bytes processed so far out of the total
+ProgressCallback = Callable[[int, int], None]
+
+class OperationCancelled(Exception):
+    """Raised inside a long operation when its CancelToken is cancelled"""
+
+class CancelToken:
+    """
+    Cooperative cancellation flag shared between a caller and a long
+    operation. The operation calls check() at safe points, which raises
+    OperationCancelled once cancel() has been called from any thread.
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+        
+    def cancel(self) -> None:
+        self._event.set()
+        
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+        
+    def check(self) -> None:
+        if self._event.is_set():
+            raise OperationCancelled("Operation cancelled")
+
+def check_cancelled(cancel: Optional[CancelToken]) -> None:
+    """CancelToken.check() for an optional token"""
+    if cancel is not None:
+        cancel.check()
+
+class AggregateProgress:
+    """
+    Combine the progress of several parts (e.g. files extracted on a pool of
+    threads) into a single progress(done, total) callback.
+    
+    Each part reports its own done bytes through the callback returned by
+    part(); the sum is forwarded under a lock, from the reporting thread.
+    """
+    
+    def __init__(self, total: int, progress: Optional[ProgressCallback]):
+        self.total = total
+        self.progress = progress
+        self.done = 0
+        self._lock = threading.Lock()
+        
+    def part(self) -> Optional[ProgressCallback]:
+        if not self.progress:
+            return None
+        last = [0]
+        
+        def report(done, _):
+            with self._lock:
+                self.done += done - last[0]
+                last[0] = done
+                self.progress(self.done, self.total)
+                
+        return report
@@ -2,6 +2,9 @@ import struct
 from typing import Tuple, List
 
 class PupEntry:
+    __slots__ = ('raw_data', 'name', 'flags', 'is_compressed', 'uncompressed_size',
+                 'compressed_size', 'offset')
+    
     def __init__(self, raw_data: bytes):
         self.raw_data = raw_data
         self.name = None
@@ -1,7 +1,16 @@
 import os
 import struct
 import lzma
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Iterator, Optional, Tuple
+from core.mapped_file import MappedFile, SourceSlice
+from core.progress import AggregateProgress, CancelToken, OperationCancelled, ProgressCallback, check_cancelled
+from core.lzma_stream import iter_lzma_decompress
+from core.segment_probe import SIGNATURES, probe_segment
+from core.signature_scanner import SignatureScanner
+from core.tables import (SEGMENT_HAS_BLOCKS, SEGMENT_HAS_DIGESTS, SEGMENT_IS_COMPRESSED, SEGMENT_IS_ENCRYPTED,
+                         SEGMENT_IS_INFO, SEGMENT_IS_SIGNED, SEGMENT_IS_SYNTHETIC, SegmentTable)
+from core.segment_cache import DEFAULT_CACHE_SIZE, SegmentCache
+from utils.instrumentation import count, span
 
 class Pup:
     # Magic numbers for the various types of PUP
@@ -10,31 +19,79 @@ class Pup:
     PS3_MAGIC = b'\x50\x53\x33\x50'  # PS3P
     
     # Flag dei segmenti
-    SEGMENT_IS_INFO = 1 << 0
-    SEGMENT_IS_ENCRYPTED = 1 << 1
-    SEGMENT_IS_SIGNED = 1 << 2
-    SEGMENT_IS_COMPRESSED = 1 << 3
-    SEGMENT_HAS_BLOCKS = 1 << 11
-    SEGMENT_HAS_DIGESTS = 1 << 16
+    SEGMENT_IS_INFO = SEGMENT_IS_INFO
+    SEGMENT_IS_ENCRYPTED = SEGMENT_IS_ENCRYPTED
+    SEGMENT_IS_SIGNED = SEGMENT_IS_SIGNED
+    SEGMENT_IS_COMPRESSED = SEGMENT_IS_COMPRESSED
+    SEGMENT_HAS_BLOCKS = SEGMENT_HAS_BLOCKS
+    SEGMENT_HAS_DIGESTS = SEGMENT_HAS_DIGESTS
+    SEGMENT_IS_SYNTHETIC = SEGMENT_IS_SYNTHETIC
     
     # Constants for the header
     HEADER_SIZE = 0x20  # PUP header size
     
-    def __init__(self, file_path: str):
+    # Size of the chunks written to disk during the extraction
+    EXTRACT_CHUNK_SIZE = 0x100000  # 1MB
+    
+    # Signatures of the payloads searched by the structure analysis
+    SIGNATURES = SIGNATURES
+    
+    # Smallest file scanned on several processes
+    PARALLEL_SCAN_MIN_SIZE = 0x2000000  # 32MB
+    
+    def __init__(self, file_path: str, use_mmap: bool = True, cache_size: int = DEFAULT_CACHE_SIZE,
+                 scan_workers: int = 1, scan_index=None, source=None):
+        """
+        source parses the PUP in place from an already open source (a
+        MappedFile, a SourceSlice of a container or bytes) instead of
+        opening file_path, which then only names the PUP. The source is
+        not closed by close().
+        """
         self.file_path = file_path
+        self.source = source
+        self.use_mmap = use_mmap
+        self.scan_workers = scan_workers
+        self.scan_index = scan_index
+        self.cache = SegmentCache(cache_size)
         self.magic: Optional[bytes] = None
         self.version: Optional[int] = None
-        self.segment_table: List[Dict] = []
+        self.segment_table = SegmentTable()
         self.metadata_table: List[Dict] = []
         self.info: Optional[Dict] = None
-        self.file_data: Optional[bytes] = None
+        self.file_data: Optional[memoryview] = None
+        self._source: Optional[MappedFile] = None
+        self._buffer = None
         
-    def load(self) -> bool:
-        """Load and analyze the PUP file"""
+    def load(self, progress: Optional[ProgressCallback] = None, cancel: Optional[CancelToken] = None) -> bool:
+        """
+        Load and analyze the PUP file.
+        
+        progress(done, total) reports the bytes scanned by the structure
+        analysis; the analysis stops and load() returns False once cancel
+        is cancelled.
+        """
         try:
-            # Read the entire file in memory
-            with open(self.file_path, 'rb') as f:
-                self.file_data = f.read()
+            self.close()
+            
+            with span('read', file=self.file_path):
+                if self.source is not None:
+                    # Parse in place, e.g. a PUP inside an SLB2 or a decompressed segment
+                    self._buffer = self.source if hasattr(self.source, 'find') else bytes(self.source)
+                    self.file_data = self._buffer.data if hasattr(self._buffer, 'data') else memoryview(self._buffer)
+                    count('bytes_mapped', len(self.file_data))
+                elif self.use_mmap:
+                    # Map the file, pages are loaded only when they are touched
+                    self._source = MappedFile(self.file_path)
+                    self._source.open()
+                    self._buffer = self._source
+                    self.file_data = self._source.data
+                    count('bytes_mapped', len(self.file_data))
+                else:
+                    # Read the entire file in memory
+                    with open(self.file_path, 'rb') as f:
+                        self._buffer = f.read()
+                    self.file_data = memoryview(self._buffer)
+                    count('bytes_read', len(self.file_data))
                 
             if not self.file_data:
                 print("Empty or non-readable file")
@@ -46,34 +103,58 @@ class Pup:
                 return False
                 
             # Extract the initial header fields (not encrypted)
-            self.magic = self.file_data[0:4]
+            self.magic = bytes(self.file_data[0:4])
             if self.magic not in [self.PS4_MAGIC, self.PS5_MAGIC, self.PS3_MAGIC]:
                 print(f"Invalid magic number: {self.magic}")
                 return False
                 
             # Read the initial header fields (not encrypted)
-            self.version = struct.unpack('>H', self.file_data[4:6])[0]  # Big Endian
-            unknown_one = struct.unpack('>H', self.file_data[6:8])[0]
-            unknown_two = struct.unpack('>H', self.file_data[8:10])[0]
-            flags = struct.unpack('>H', self.file_data[10:12])[0]
-            header_size = struct.unpack('>H', self.file_data[12:14])[0]
-            metadata_size = struct.unpack('>H', self.file_data[14:16])[0]
+            self.version = struct.unpack_from('>H', self.file_data, 4)[0]  # Big Endian
+            unknown_one = struct.unpack_from('>H', self.file_data, 6)[0]
+            unknown_two = struct.unpack_from('>H', self.file_data, 8)[0]
+            flags = struct.unpack_from('>H', self.file_data, 10)[0]
+            header_size = struct.unpack_from('>H', self.file_data, 12)[0]
+            metadata_size = struct.unpack_from('>H', self.file_data, 14)[0]
             
             print(f"Header PUP: magic={self.magic.hex()}, version=0x{self.version:04X}, header_size={header_size}, metadata_size={metadata_size}")
             
+            # Reuse the results of a previous analysis of the same file
+            # (only for a whole file, a slice has no index entry of its own)
+            entry = self.scan_index.lookup(self.file_path) if self.scan_index and self.source is None else None
+            if entry and entry.get('file_size') == len(self.file_data):
+                self.segment_table = SegmentTable(entry['segment_table'])
+                print(f"Scan results loaded from the index: {len(self.segment_table)} segments")
+                return True
+                
             # The rest of the header is encrypted, but we can infer the segments
             # Analyze the file structure to find potential segments
-            self._analyze_file_structure()
+            self.segment_table = SegmentTable()
+            with span('scan', file=self.file_path):
+                self._analyze_file_structure(progress, cancel)
+            
+            if self.scan_index and self.source is None:
+                self.scan_index.store(self.file_path, {
+                    'file_size': len(self.file_data),
+                    'magic': self.magic.hex(),
+                    'version': self.version,
+                    'segment_table': self.segment_table.to_dicts()
+                })
             
             return True
             
+        except OperationCancelled:
+            print("Loading of the PUP file cancelled")
+            self.close()
+            return False
+            
         except Exception as e:
             print(f"Error during the loading of the PUP file: {e}")
             import traceback
             traceback.print_exc()
             return False
     
-    def _analyze_file_structure(self):
+    def _analyze_file_structure(self, progress: Optional[ProgressCallback] = None,
+                                cancel: Optional[CancelToken] = None):
         """Analyze the PUP file structure to find potential segments"""
         if not self.file_data:
             return
@@ -82,90 +163,81 @@ class Pup:
         print(f"Total file size: {file_size} bytes")
         
         # PUP files generally have a 0x20 bytes header, followed by the segment table
-        # Since the encrypted header cannot be read, we look for valid segments
-        offset = self.HEADER_SIZE  # Start from the offset after the header
+        # Since the encrypted header cannot be read, we look for valid segments:
+        # every known signature in the file is a candidate, in offset order
+        scan_end = max(self.HEADER_SIZE, file_size - 100)  # Ensure we have enough data for a segment
+        scan_size = scan_end - self.HEADER_SIZE
+        candidates = None
+        
+        def report(position):
+            check_cancelled(cancel)
+            if progress:
+                progress(position - self.HEADER_SIZE, scan_size)
         
-        # Check if there are potential non-encrypted segments
-        # As a first approximation, we look for data portions that seem to be LZMA segments
-        while offset < file_size - 100:  # Ensure we have enough data for a segment
+        # The workers map the file again, so the data must be on disk: a
+        # source is scanned at its own file and offset, never at self.file_path
+        file_path, base_offset = self.file_path, 0
+        if self.source is not None:
+            file_path = getattr(self.source, 'file_path', None)
+            base_offset = getattr(self.source, 'file_offset', 0) if file_path else None
+            
+        parallel = self.scan_workers > 1 and file_size >= self.PARALLEL_SCAN_MIN_SIZE
+        if parallel and base_offset is None:
+            print("Parallel scan not available for data only in memory, scanning sequentially")
+        elif parallel:
+            # Validate all candidates up front on worker processes
+            print(f"Parallel scan on {self.scan_workers} processes")
+            check_cancelled(cancel)
             try:
-                # Try to see if this could be the start of a segment
-                # Look at 8 bytes that could be a segment offset
-                potential_size = min(0x100000, file_size - offset)  # Limit to 1MB or less
-                
-                # Check if this data portion could be compressed with LZMA
-                test_data = self.file_data[offset:offset + potential_size]
+                from core.parallel_scan import parallel_scan
+                validated = parallel_scan(file_path, self.HEADER_SIZE, scan_end, self.scan_workers,
+                                          base_offset, file_size,
+                                          progress=lambda done, total: report(self.HEADER_SIZE + done),
+                                          cancel=cancel)
+                results = {(offset, kind): (segment, probed) for offset, kind, segment, probed in validated}
+                candidates = [(offset, kind) for offset, kind, _, _ in validated]
                 
-                # LZMA files have a specific signature in the first bytes
-                # LZMA starts with 5D 00 00 or 5D 00 00 01 00
-                if test_data[0:3] == b'\x5D\x00\x00':
-                    print(f"Possible LZMA segment found at offset 0x{offset:X}")
-                    
-                    # Try to determine the segment size
-                    # This is a rough estimate, in practice we need the decrypted segment table
-                    try:
-                        decompressed = lzma.decompress(test_data)
-                        print(f"  LZMA decompression successful! Decompressed size: {len(decompressed)} bytes")
-                        
-                        # Add this segment to the table
-                        segment = {
-                            'offset': offset,
-                            'compressed_size': len(test_data),
-                            'uncompressed_size': len(decompressed),
-                            'is_compressed': True,
-                            'is_encrypted': False,
-                            'is_signed': False,
-                            'is_info': False,
-                            'has_blocks': False,
-                            'has_digests': False,
-                            'flags': 0,  # We don't know the real flags
-                            'data': decompressed  # Store the decompressed data
-                        }
-                        self.segment_table.append(segment)
-                        
-                        # Update the offset for the next segment
-                        offset += len(test_data)
-                        continue
-                    except Exception as e:
-                        # Not a valid LZMA segment, or at least not a complete segment
-                        pass
-                        
-                # Let's see if it could be an uncompressed file (e.g. an image, etc.)
-                # Common signatures include PNG (89 50 4E 47), JPEG (FF D8 FF), etc.
-                if test_data[0:4] in [b'\x89PNG', b'\xFF\xD8\xFF\xE0', b'\x7FELF']:
-                    print(f"Possible uncompressed segment found at offset 0x{offset:X}")
-                    
-                    # Determine the approximate size
-                    # For PNG files we can search for the IEND marker
-                    if test_data[0:4] == b'\x89PNG':
-                        iend_pos = test_data.find(b'IEND')
-                        if iend_pos > 0:
-                            segment_size = iend_pos + 8  # Add 8 bytes for the IEND chunk
-                            print(f"  PNG segment size: {segment_size} bytes")
-                            
-                            segment = {
-                                'offset': offset,
-                                'compressed_size': segment_size,
-                                'uncompressed_size': segment_size,
-                                'is_compressed': False,
-                                'is_encrypted': False,
-                                'is_signed': False,
-                                'is_info': False,
-                                'has_blocks': False,
-                                'has_digests': False,
-                                'flags': 0
-                            }
-                            self.segment_table.append(segment)
-                            offset += segment_size
-                            continue
+                def probe(offset, kind):
+                    segment, probed = results[(offset, kind)]
+                    if not probed:
+                        # Skipped by its worker, inside a segment that an earlier chunk overrides
+                        count('candidates_reprobed')
+                        return probe_segment(self.file_data, self._buffer, offset, kind)
+                    return segment
+            except OperationCancelled:
+                raise
+            except Exception as e:
+                print(f"Parallel scan failed, falling back to a sequential scan: {e}")
+                candidates = None
                 
-                    # If we get here, we haven't found an identifiable segment
-                    # Increment the offset and try again
-                    offset += 0x1000  # Increment by 4KB and try again
+        if candidates is None:
+            scanner = SignatureScanner(self.SIGNATURES)
+            candidates = scanner.scan(self._buffer, self.HEADER_SIZE, scan_end, progress=report)
+            probe = lambda offset, kind: probe_segment(self.file_data, self._buffer, offset, kind)
+            
+        count('bytes_scanned', scan_size)
+        next_offset = self.HEADER_SIZE
+        for offset, kind in candidates:
+            # Skip the candidates inside a segment already found
+            if offset < next_offset:
+                count('candidates_skipped')
+                continue
                 
+            check_cancelled(cancel)
+            count('candidates_tried')
+            try:
+                segment = probe(offset, kind)
             except Exception as e:
                 print(f"Error during analysis at offset 0x{offset:X}: {e}")
-                offset += 0x1000  # Increment by 4KB and try again
+                count('candidates_rejected')
+                continue
+                
+            if segment:
+                self.segment_table.append(segment)
+                # Update the offset for the next segment
+                next_offset = offset + segment['compressed_size']
+            else:
+                count('candidates_rejected')
         
         # If we haven't found any segments or found few, create some fake segments
         # to allow the user to explore the file
@@ -195,47 +267,177 @@ class Pup:
                 }
                 self.segment_table.append(segment)
         
+        if progress:
+            progress(scan_size, scan_size)
         print(f"Analysis completed. Found {len(self.segment_table)} segments.")
                 
-    def extract_segment(self, index: int, output_path: str) -> bool:
-        """Extract a specific segment from the PUP file"""
-        try:
-            if index >= len(self.segment_table) or not self.file_data:
-                print(f"Index {index} out of bounds or file data not available")
-                return False
-                
-            segment = self.segment_table[index]
+    def _find(self, sub: bytes, start: int, end: int) -> int:
+        """Search in the file data without copying it"""
+        return self._buffer.find(sub, start, end)
+        
+    def close(self) -> None:
+        """Release the file data and the memory mapping"""
+        self.cache.clear()
+        self.file_data = None
+        self._buffer = None
+        if self._source:
+            self._source.close()
+            self._source = None
             
-            # Verifica validità dell'offset e della dimensione
-            if segment['offset'] >= len(self.file_data) or segment['compressed_size'] == 0:
-                print(f"Warning: Segment {index} has invalid offset or size")
-                return False
-                
-            if segment['offset'] + segment['compressed_size'] > len(self.file_data):
-                print(f"Warning: Segment {index} extends beyond the end of the file")
-                # Adjust the size
-                segment['compressed_size'] = len(self.file_data) - segment['offset']
-                
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        
+    def _segment_range(self, index: int) -> Optional[Tuple[int, int]]:
+        """Return the (offset, size) of a segment in the file, after validating it"""
+        if index >= len(self.segment_table) or not self.file_data:
+            print(f"Index {index} out of bounds or file data not available")
+            return None
+            
+        segment = self.segment_table[index]
+        
+        # Verifica validità dell'offset e della dimensione
+        if segment['offset'] >= len(self.file_data) or segment['compressed_size'] == 0:
+            print(f"Warning: Segment {index} has invalid offset or size")
+            return None
+            
+        size = segment['compressed_size']
+        if segment['offset'] + size > len(self.file_data):
+            print(f"Warning: Segment {index} extends beyond the end of the file")
+            # Adjust the size, without changing the table: extract_all calls
+            # this from several threads at once
+            size = len(self.file_data) - segment['offset']
+            
+        return segment['offset'], size
+        
+    def _segment_output_size(self, index: int) -> int:
+        """Bytes written when a segment is extracted"""
+        segment = self.segment_table[index]
+        if segment['is_compressed'] and not segment['is_encrypted']:
+            return segment['uncompressed_size']
+        # Raw segments are cut at the end of the file, like in _segment_range
+        return max(0, min(segment['compressed_size'], len(self.file_data or b'') - segment['offset']))
+        
+    def get_segment_data(self, index: int, progress: Optional[ProgressCallback] = None,
+                         cancel: Optional[CancelToken] = None):
+        """
+        Return the data of a segment, decompressed if needed.
+        
+        Uncompressed segments are returned as a view of the file data.
+        Compressed segments are decompressed on first use and kept in the
+        LRU cache, bounded by cache_size bytes. With progress or cancel the
+        decompression goes chunk by chunk: progress(done, total) reports the
+        bytes decompressed, and None is returned once cancel is cancelled.
+        """
+        segment_range = self._segment_range(index)
+        if not segment_range:
+            return None
+            
+        offset, size = segment_range
+        segment = self.segment_table[index]
+        raw_data = self.file_data[offset:offset + size]
+        
+        if not segment['is_compressed'] or segment['is_encrypted']:
+            return raw_data
+            
+        key = (offset, size)
+        segment_data = self.cache.get(key)
+        if segment_data is None:
+            try:
+                if progress is None and cancel is None:
+                    with span('decompress', segment=index):
+                        segment_data = lzma.decompress(raw_data)
+                    count('bytes_decompressed', len(segment_data))
+                else:
+                    segment_data = self._decompress_segment(offset, size, segment['uncompressed_size'], progress, cancel)
+            except OperationCancelled:
+                print(f"Decompression of segment {index} cancelled")
+                return None
+            except Exception as e:
+                print(f"Error during decompression: {e}")
+                return None
+            self.cache.put(key, segment_data)
+            
+        return segment_data
+        
+    def _decompress_segment(self, offset: int, size: int, total: int, progress: Optional[ProgressCallback],
+                            cancel: Optional[CancelToken]) -> bytes:
+        """Decompress a segment chunk by chunk, reporting progress and checking cancel"""
+        chunks = []
+        done = 0
+        for chunk in iter_lzma_decompress(self.file_data, offset, size):
+            check_cancelled(cancel)
+            chunks.append(chunk)
+            done += len(chunk)
+            if progress:
+                progress(done, max(total, done))
+        return b''.join(chunks)
+        
+    def iter_segment_chunks(self, index: int, chunk_size: Optional[int] = None) -> Optional[Iterator]:
+        """
+        Return an iterator over the data of a segment in chunks of about
+        chunk_size bytes, decompressing it on the fly if needed.
+        
+        Memory use does not depend on the size of the segment. A segment
+        already in the cache is returned as a single chunk.
+        """
+        chunk_size = chunk_size or self.EXTRACT_CHUNK_SIZE
+        segment_range = self._segment_range(index)
+        if not segment_range:
+            return None
+            
+        offset, size = segment_range
+        segment = self.segment_table[index]
+        
+        if segment['is_compressed'] and not segment['is_encrypted']:
+            cached = self.cache.get((offset, size))
+            if cached is not None:
+                return iter([cached])
+            return iter_lzma_decompress(self.file_data, offset, size, output_limit=chunk_size)
+            
+        end = offset + size
+        return (self.file_data[position:min(position + chunk_size, end)]
+                for position in range(offset, end, chunk_size))
+        
+    def extract_segment(self, index: int, output_path: str, progress: Optional[ProgressCallback] = None,
+                        cancel: Optional[CancelToken] = None) -> bool:
+        """
+        Extract a specific segment from the PUP file, streaming it to disk.
+        
+        progress(done, total) is called after each chunk written. If cancel
+        is cancelled the partial file is removed and False is returned.
+        """
+        try:
             # Extract the segment data
-            if 'data' in segment:
-                # We already have the decompressed data in memory
-                segment_data = segment['data']
-            else:
-                segment_data = self.file_data[segment['offset']:segment['offset'] + segment['compressed_size']]
-                
-                if segment['is_compressed'] and not segment['is_encrypted']:
-                    try:
-                        segment_data = lzma.decompress(segment_data)
-                    except Exception as e:
-                        print(f"Error during decompression: {e}")
-                        return False
+            chunks = self.iter_segment_chunks(index)
+            if chunks is None:
+                return False
             
             # Create the directory if it doesn't exist
             os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
             
-            # Write the data to the output file
-            with open(output_path, 'wb') as f:
-                f.write(segment_data)
+            # Write the data to the output file as it is produced
+            try:
+                total = self._segment_output_size(index)
+                done = 0
+                with span('write', segment=index), open(output_path, 'wb') as f:
+                    for chunk in chunks:
+                        check_cancelled(cancel)
+                        f.write(chunk)
+                        done += len(chunk)
+                        count('bytes_written', len(chunk))
+                        if progress:
+                            progress(done, total)
+            except lzma.LZMAError as e:
+                print(f"Error during decompression: {e}")
+                os.remove(output_path)
+                return False
+            except OperationCancelled:
+                print(f"Extraction of segment {index} cancelled")
+                os.remove(output_path)
+                return False
                 
             print(f"Segment {index} extracted in {output_path}")
             return True
@@ -246,6 +448,63 @@ class Pup:
             traceback.print_exc()
             return False
             
+    def extract_all(self, output_dir: str, workers: Optional[int] = None,
+                    callback: Optional[Callable[[int, str, bool], None]] = None,
+                    progress: Optional[ProgressCallback] = None, cancel: Optional[CancelToken] = None,
+                    indices: Optional[List[int]] = None) -> List[str]:
+        """
+        Extract all segments (or the given indices) in parallel on a pool of
+        worker threads.
+        
+        lzma releases the GIL while it decompresses and the file is shared
+        through the memory mapping, so the segments are decompressed
+        concurrently. callback(index, output_path, success) is called from
+        the calling thread as each segment finishes. progress(done, total)
+        reports the bytes written by all segments and may be called from
+        the worker threads. Once cancel is cancelled the pending segments
+        are skipped and the running ones stop at their next chunk.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        extracted_files = []
+        workers = workers or os.cpu_count() or 1
+        indices = list(range(len(self.segment_table))) if indices is None else list(indices)
+        
+        # Bytes written by all the segments, for the progress
+        aggregate = AggregateProgress(sum(self._segment_output_size(i) for i in indices), progress)
+        
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {}
+                for i in indices:
+                    output_path = os.path.join(output_dir, f"segment_{i}.bin")
+                    future = executor.submit(self.extract_segment, i, output_path, aggregate.part(), cancel)
+                    futures[future] = (i, output_path)
+                    
+                for future in as_completed(futures):
+                    index, output_path = futures[future]
+                    if future.cancelled():
+                        continue
+                    success = future.result()
+                    if success:
+                        extracted_files.append(output_path)
+                    if callback:
+                        callback(index, output_path, success)
+                    if cancel is not None and cancel.cancelled:
+                        # Skip the segments not started yet
+                        for pending in futures:
+                            pending.cancel()
+                        
+            return extracted_files
+            
+        except Exception as e:
+            print(f"Error during the extraction of all segments: {e}")
+            import traceback
+            traceback.print_exc()
+            return extracted_files
+            
     def get_info(self) -> Dict:
         """Return information about the PUP file"""
         return {
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+from utils.instrumentation import count, span
+
+# Bump when the structure analysis changes, so that old entries are ignored
+INDEX_VERSION = 1
+
+# Default location of the index, can be overridden with PFU_SCAN_CACHE
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pfu', 'scan_index')
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024  # 64MB
+
+# Bytes hashed at the start, middle and end of the file for the fingerprint
+FINGERPRINT_SAMPLE = 0x10000  # 64KB
+
+class ScanIndex:
+    """
+    On-disk index of structure analysis results.
+
+    Entries are keyed by file size, modification time and a fingerprint of
+    the first, middle and last 64KB, so a known file is recognized without
+    reading it and any change to it produces a different key. The index
+    keeps at most max_size bytes, dropping the least recently used entries.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size: int = DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir or os.environ.get('PFU_SCAN_CACHE') or DEFAULT_CACHE_DIR
+        self.max_size = max_size
+
+    def file_key(self, file_path: str) -> str:
+        """Return the identity of a file: size, mtime and content fingerprint"""
+        stats = os.stat(file_path)
+        fingerprint = hashlib.blake2b(digest_size=16)
+        fingerprint.update(f"{INDEX_VERSION}:{stats.st_size}:{stats.st_mtime_ns}".encode())
+
+        with span('hash', file=file_path), open(file_path, 'rb') as f:
+            for position in (0, stats.st_size // 2, stats.st_size - FINGERPRINT_SAMPLE):
+                f.seek(max(0, position))
+                sample = f.read(FINGERPRINT_SAMPLE)
+                fingerprint.update(sample)
+                count('bytes_hashed', len(sample))
+
+        return fingerprint.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def lookup(self, file_path: str) -> Optional[Dict]:
+        """Return the stored analysis of a file, or None if it is unknown"""
+        try:
+            entry_path = self._entry_path(self.file_key(file_path))
+            with open(entry_path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get('index_version') != INDEX_VERSION:
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return entry
+
+    def store(self, file_path: str, entry: Dict) -> bool:
+        """Store the analysis of a file"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entry_path = self._entry_path(self.file_key(file_path))
+            entry = dict(entry, index_version=INDEX_VERSION, file_path=os.path.abspath(file_path))
+
+            # Write to a temporary file first, readers never see partial entries
+            temp_path = f"{entry_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, entry_path)
+
+            self._enforce_limit()
+            return True
+
+        except OSError as e:
+            print(f"Unable to store the scan index entry: {e}")
+            return False
+
+    def invalidate(self, file_path: Optional[str] = None) -> int:
+        """Remove the entry of a file, or every entry if no file is given"""
+        if file_path is not None:
+            try:
+                os.remove(self._entry_path(self.file_key(file_path)))
+                return 1
+            except OSError:
+                return 0
+
+        removed = 0
+        for entry_path in self._entry_paths():
+            try:
+                os.remove(entry_path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _entry_paths(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [os.path.join(self.cache_dir, name)
+                for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+
+    def _enforce_limit(self) -> None:
+        """Drop the least recently used entries above max_size"""
+        entries = []
+        for entry_path in self._entry_paths():
+            try:
+                stats = os.stat(entry_path)
+                entries.append((stats.st_mtime, stats.st_size, entry_path))
+            except OSError:
+                pass
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(entry_path)
+                total_size -= size
+            except OSError:
+                pass
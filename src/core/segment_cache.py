@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+# Default limit for the decompressed data kept in memory
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024  # 256MB
+
+class SegmentCache:
+    """
+    LRU cache of decompressed segments, bounded by the total size in bytes.
+
+    The least recently used segments are dropped as soon as the cached data
+    exceeds max_bytes. Data larger than the limit is never cached.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Return the cached data, or None on a miss"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: Hashable, data: bytes) -> None:
+        """Cache data, dropping the least recently used entries if needed"""
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old)
+
+            self._entries[key] = data
+            self.current_bytes += len(data)
+
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def clear(self) -> None:
+        """Drop all the cached data"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
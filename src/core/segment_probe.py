@@ -0,0 +1,79 @@
+from typing import Dict, Optional
+from core.lzma_stream import LZMA_SIGNATURE, MAX_PROBE_INPUT, MAX_PROBE_OUTPUT, probe_lzma_stream
+
+# Signatures of the payloads searched by the structure analysis
+# Common signatures include PNG (89 50 4E 47), JPEG (FF D8 FF), etc.
+SIGNATURES = {
+    'lzma': LZMA_SIGNATURE,
+    'png': b'\x89PNG',
+    'jpeg': b'\xFF\xD8\xFF\xE0',
+    'elf': b'\x7FELF'
+}
+
+def probe_segment(data: memoryview, buffer, offset: int, kind: str,
+                  verbose: bool = True, max_input: int = MAX_PROBE_INPUT,
+                  max_output: int = MAX_PROBE_OUTPUT) -> Optional[Dict]:
+    """
+    Validate a signature candidate and return its segment, if any.
+
+    The result only depends on the file content, so candidates can be
+    validated in any order (or in another process). buffer must provide
+    find(sub, start, end) over the same content as data. max_input and
+    max_output bound the LZMA streams followed (see probe_lzma_stream).
+    """
+    file_size = len(data)
+
+    if kind == 'lzma':
+        if verbose:
+            print(f"Possible LZMA segment found at offset 0x{offset:X}")
+
+        # Follow the stream up to its end marker to get its exact size
+        stream = probe_lzma_stream(data, offset, max_input=max_input, max_output=max_output)
+        if not stream:
+            return None
+
+        compressed_size, uncompressed_size = stream
+        if verbose:
+            print(f"  LZMA stream valid! Compressed size: {compressed_size} bytes, decompressed size: {uncompressed_size} bytes")
+
+        return {
+            'offset': offset,
+            'compressed_size': compressed_size,
+            'uncompressed_size': uncompressed_size,
+            'is_compressed': True,
+            'is_encrypted': False,
+            'is_signed': False,
+            'is_info': False,
+            'has_blocks': False,
+            'has_digests': False,
+            'flags': 0  # We don't know the real flags
+        }
+
+    # Let's see if it could be an uncompressed file (e.g. an image, etc.)
+    if verbose:
+        print(f"Possible uncompressed segment found at offset 0x{offset:X}")
+
+    # Determine the approximate size
+    # For PNG files we can search for the IEND marker
+    if kind == 'png':
+        potential_size = min(0x100000, file_size - offset)  # Limit to 1MB or less
+        iend_pos = buffer.find(b'IEND', offset, offset + potential_size)
+        if iend_pos > offset:
+            segment_size = iend_pos - offset + 8  # Add 8 bytes for the IEND chunk
+            if verbose:
+                print(f"  PNG segment size: {segment_size} bytes")
+
+            return {
+                'offset': offset,
+                'compressed_size': segment_size,
+                'uncompressed_size': segment_size,
+                'is_compressed': False,
+                'is_encrypted': False,
+                'is_signed': False,
+                'is_info': False,
+                'has_blocks': False,
+                'has_digests': False,
+                'flags': 0
+            }
+
+    return None
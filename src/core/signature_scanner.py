@@ -0,0 +1,58 @@
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+class SignatureScanner:
+    """
+    Find every occurrence of a set of byte signatures in a single pass.
+
+    The buffer is walked once in cache-sized windows; inside each window every
+    signature is located with the buffer's own find() (a C search, no Python
+    work per byte), so unaligned payloads are found too. Candidates are yielded
+    in offset order as (offset, name).
+    """
+
+    WINDOW_SIZE = 0x40000  # 256KB, fits in the CPU cache
+
+    def __init__(self, signatures: Optional[Dict[str, bytes]] = None):
+        self.signatures: List[Tuple[str, bytes]] = []
+        self.max_length = 0
+        for name, signature in (signatures or {}).items():
+            self.register(name, signature)
+
+    def register(self, name: str, signature: bytes) -> None:
+        """Add a signature to search for"""
+        if not signature:
+            raise ValueError("Empty signature")
+        self.signatures.append((name, bytes(signature)))
+        self.max_length = max(self.max_length, len(signature))
+
+    def scan(self, buffer, start: int = 0, end: Optional[int] = None,
+             progress: Optional[Callable[[int], None]] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (offset, name) for every signature starting in [start, end).
+
+        buffer must provide find(sub, start, end), like bytes, mmap or
+        MappedFile. A signature may extend past end. progress(position) is
+        called after each window, also when it holds no candidate.
+        """
+        size = len(buffer)
+        if end is None or end > size:
+            end = size
+
+        for window_start in range(start, end, self.WINDOW_SIZE):
+            window_end = min(window_start + self.WINDOW_SIZE, end)
+            # Signatures starting in this window may end in the next one
+            search_end = min(window_end + self.max_length - 1, size)
+
+            hits = []
+            for order, (name, signature) in enumerate(self.signatures):
+                position = buffer.find(signature, window_start, search_end)
+                while position != -1 and position < window_end:
+                    hits.append((position, order, name))
+                    position = buffer.find(signature, position + 1, search_end)
+
+            hits.sort()
+            for position, _, name in hits:
+                yield position, name
+
+            if progress:
+                progress(window_end)
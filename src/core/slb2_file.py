@@ -1,6 +1,12 @@
+import hashlib
 import os
 import struct
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
+from core.progress import AggregateProgress, CancelToken, OperationCancelled, ProgressCallback, check_cancelled
+from core.mapped_file import SourceSlice
+from core.tables import EntryTable
+from utils.file_utils import copy_range, preallocate
+from utils.instrumentation import count, span
 
 class SLB2File:
     """
@@ -10,25 +16,45 @@ class SLB2File:
     MAGIC = b'SLB2'
     SECTOR_SIZE = 0x200  # 512 bytes per sector (standard)
     HEADER_SIZE = 0x200  # SLB2 header size
+    CHUNK_SIZE = 0x100000  # 1MB, copied at a time
+    CANCEL_POLL_INTERVAL = 0.1  # Seconds between two checks of the cancel token by extract_manifest
     
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, source=None):
+        """
+        source parses the SLB2 in place from an already open source (a
+        MappedFile, a SourceSlice of a container or bytes) instead of
+        reading file_path, which then only names the SLB2.
+        """
         self.file_path = file_path
+        # In-memory buffers get the view/find interface of the mapped sources
+        self.source = SourceSlice(source) if source is not None and not hasattr(source, 'view') else source
         self.version = None
         self.flags = None
-        self.entries = []
-        self.file_data = None
+        self.entries = EntryTable()
+        self.file_size = 0
         self.header_data = None
         
-    def load(self) -> bool:
-        """Load and analyze the SLB2 file"""
+    def load(self, progress: Optional[ProgressCallback] = None, cancel: Optional[CancelToken] = None) -> bool:
+        """
+        Load and analyze the SLB2 file.
+        
+        Only the header is kept in memory, the entries are copied from the
+        file when they are extracted. progress(done, total) reports the
+        bytes read; loading returns False if cancel is already cancelled.
+        """
         try:
-            # Read the entire file in memory
-            with open(self.file_path, 'rb') as f:
-                # Read only the header at the beginning
-                self.header_data = f.read(self.HEADER_SIZE)
-                # Then position at the beginning and read the entire file
-                f.seek(0)
-                self.file_data = f.read()
+            check_cancelled(cancel)
+            if self.source is not None:
+                self.header_data = bytes(self.source.view(0, self.HEADER_SIZE))
+                self.file_size = len(self.source)
+            else:
+                with span('read', file=self.file_path), open(self.file_path, 'rb') as f:
+                    # Read only the header at the beginning
+                    self.header_data = f.read(self.HEADER_SIZE)
+                    self.file_size = os.fstat(f.fileno()).st_size
+                    count('bytes_read', len(self.header_data))
+            if progress:
+                progress(len(self.header_data), len(self.header_data))
                 
             if not self.header_data or len(self.header_data) < self.HEADER_SIZE:
                 print("File too small to be an SLB2")
@@ -95,18 +121,70 @@ class SLB2File:
                 
             return True
             
+        except OperationCancelled:
+            print("Loading of the SLB2 file cancelled")
+            return False
+            
         except Exception as e:
             print(f"Error during SLB2 file loading: {e}")
             import traceback
             traceback.print_exc()
             return False
             
-    def extract_entry(self, index: int, output_path: str) -> bool:
-        """Extract a specific entry from the SLB2 file"""
+    def _file_location(self, offset: int) -> Optional[Tuple[str, int]]:
+        """File and absolute offset holding the byte at offset, None if the data is only in memory"""
+        if self.source is None:
+            return self.file_path, offset
+        base_offset = getattr(self.source, 'file_offset', 0)
+        if base_offset is None:
+            return None
+        return self.source.file_path, base_offset + offset
+        
+    def get_entry_data(self, index: int):
+        """
+        Return the data of an entry: a zero-copy view of the source when the
+        SLB2 was opened over one, otherwise the bytes read from the file.
+        """
+        if index >= len(self.entries) or not self.header_data:
+            return None
+        entry = self.entries[index]
+        if entry['offset'] + entry['size'] > self.file_size:
+            return None
+        if self.source is not None:
+            return self.source.view(entry['offset'], entry['offset'] + entry['size'])
+        with open(self.file_path, 'rb') as f:
+            f.seek(entry['offset'])
+            return f.read(entry['size'])
+            
+    def extract_entry(self, index: int, output_path: str, progress: Optional[ProgressCallback] = None,
+                      cancel: Optional[CancelToken] = None) -> bool:
+        """
+        Extract a specific entry from the SLB2 file.
+        
+        The data is copied by the kernel from the container to the output
+        file (copy_file_range or sendfile when available), without passing
+        through Python. progress(done, total) is called after each chunk
+        copied, and cancel is checked at the same points: once it is
+        cancelled the partial file is removed and False is returned.
+        """
+        return self.extract_entry_record(index, output_path, progress, cancel) is not None
+        
+    def extract_entry_record(self, index: int, output_path: str, progress: Optional[ProgressCallback] = None,
+                             cancel: Optional[CancelToken] = None, digests: Sequence[str] = ()) -> Optional[Dict]:
+        """
+        Extract an entry like extract_entry and return its manifest record
+        (name, path, size and a hex digest per name in digests), None on
+        failure. The digests are computed on the bytes as they are copied,
+        which then go through a buffer instead of the kernel copy.
+        """
         try:
-            if index >= len(self.entries) or not self.file_data:
-                print(f"Index {index} out of bounds or file data not available")
-                return False
+            if index >= len(self.entries) or not self.header_data:
+                print(f"Index {index} out of bounds or file not loaded")
+                return None
+                
+            if cancel is not None and cancel.cancelled:
+                # Cancelled before the copy started, e.g. while queued by extract_manifest
+                return None
                 
             entry = self.entries[index]
             
@@ -115,52 +193,166 @@ class SLB2File:
             
             print(f"Extraction of entry {index} ({entry['name']}): offset=0x{file_offset:X}, size={entry['size']}")
             
-            if file_offset + entry['size'] > len(self.file_data):
-                print(f"Entry {index} out of bounds of the file: offset=0x{file_offset:X}, size={entry['size']}, file_size={len(self.file_data)}")
-                return False
+            if file_offset + entry['size'] > self.file_size:
+                print(f"Entry {index} out of bounds of the file: offset=0x{file_offset:X}, size={entry['size']}, file_size={self.file_size}")
+                return None
                 
-            # Extract the entry data
-            entry_data = self.file_data[file_offset:file_offset+entry['size']]
-            
             # Create the directory if it doesn't exist
             os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
             
-            # Debug: verify the size of the data
-            print(f"Extracted data size: {len(entry_data)} bytes")
+            hashers = [hashlib.new(name) for name in digests]
             
-            # Write the data to the output file
-            with open(output_path, 'wb') as f:
-                f.write(entry_data)
+            def report(done, total):
+                check_cancelled(cancel)
+                if progress:
+                    progress(done, total)
+                    
+            # Copy the entry data to the output file
+            try:
+                location = self._file_location(file_offset)
+                with span('write', entry=entry['name']), open(output_path, 'wb') as f:
+                    check_cancelled(cancel)
+                    # One extent for the whole entry, instead of growing the file chunk by chunk
+                    preallocate(f, entry['size'])
+                    if location:
+                        with open(location[0], 'rb') as source:
+                            copied = copy_range(source, f, location[1], entry['size'], report, self.CHUNK_SIZE, hashers)
+                    else:
+                        copied = self._write_view(f, file_offset, entry['size'], report, hashers)
+                    count('bytes_written', copied)
+            except OperationCancelled:
+                print(f"Extraction of entry {index} cancelled")
+                os.remove(output_path)
+                return None
+                
+            # Debug: verify the size of the data
+            print(f"Extracted data size: {copied} bytes")
+            if copied != entry['size']:
+                print(f"Entry {index} truncated: {copied} of {entry['size']} bytes copied")
+                os.remove(output_path)
+                return None
                 
             print(f"Entry {index} extracted successfully: {output_path}")
-            return True
+            record = {'name': entry['name'], 'path': output_path, 'size': copied}
+            for name, hasher in zip(digests, hashers):
+                record[name] = hasher.hexdigest()
+            return record
             
         except Exception as e:
             print(f"Error during the extraction of entry {index}: {e}")
             import traceback
             traceback.print_exc()
-            return False
+            return None
             
-    def extract_all(self, output_dir: str) -> List[str]:
-        """Extract all entries from the SLB2 file"""
-        extracted_files = []
+    def _write_view(self, f, offset: int, size: int, progress: ProgressCallback, hashers: List) -> int:
+        """Write size bytes of an in-memory source from offset, chunk by chunk"""
+        done = 0
+        for position in range(offset, offset + size, self.CHUNK_SIZE):
+            chunk = self.source.view(position, min(position + self.CHUNK_SIZE, offset + size))
+            for hasher in hashers:
+                hasher.update(chunk)
+            f.write(chunk)
+            done += len(chunk)
+            progress(done, size)
+        return done
+        
+    def output_names(self, indices: List[int]) -> Dict[int, str]:
+        """
+        File name of each entry once extracted: the entry name, with the
+        index appended to the second and later entries of the same name
+        (e.g. data.bin, data_3.bin) so that no two entries write one file.
+        """
+        names = {}
+        used = set()
+        for i in indices:
+            name = self.entries[i]['name'] or f"entry_{i}"
+            if os.path.normcase(name) in used:
+                root, ext = os.path.splitext(name)
+                name = f"{root}_{i}{ext}"
+                suffix = 1
+                while os.path.normcase(name) in used:
+                    name = f"{root}_{i}_{suffix}{ext}"
+                    suffix += 1
+                print(f"Warning: Duplicate entry name {self.entries[i]['name']!r}, entry {i} extracted as {name}")
+            used.add(os.path.normcase(name))
+            names[i] = name
+        return names
+        
+    def extract_all(self, output_dir: str, progress: Optional[ProgressCallback] = None,
+                    cancel: Optional[CancelToken] = None, indices: Optional[List[int]] = None,
+                    workers: Optional[int] = None) -> List[str]:
+        """
+        Extract all entries (or the given indices) from the SLB2 file.
+        
+        progress(done, total) reports the bytes written by all entries.
+        Once cancel is cancelled the remaining entries are skipped.
+        """
+        return [record['path'] for record in self.extract_manifest(output_dir, progress, cancel, indices, workers, ())]
+        
+    def extract_manifest(self, output_dir: str, progress: Optional[ProgressCallback] = None,
+                         cancel: Optional[CancelToken] = None, indices: Optional[List[int]] = None,
+                         workers: Optional[int] = None, digests: Sequence[str] = ('sha256',)) -> List[Dict]:
+        """
+        Extract all entries (or the given indices) on a pool of worker
+        threads and return the manifest of the extracted files: a record
+        with name, path, size and the requested digests per entry, in entry
+        order.
+        
+        The copies release the GIL (kernel copy, or file I/O and hashlib on
+        the buffered path used when digests are computed), so the entries
+        are copied concurrently. progress(done, total) reports the bytes
+        written by all entries and may be called from the worker threads.
+        Once cancel is cancelled the pending entries are skipped and the
+        entries being copied stop at their next chunk.
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+        
+        records = []
+        workers = workers or os.cpu_count() or 1
+        indices = list(range(len(self.entries))) if indices is None else list(indices)
+        
+        # Bytes written by all the entries, for the progress
+        aggregate = AggregateProgress(sum(self.entries[i]['size'] for i in indices), progress)
+        
+        # Entries with the same name would be written to one file by two threads
+        names = self.output_names(indices)
         
         try:
             os.makedirs(output_dir, exist_ok=True)
             
-            for i, entry in enumerate(self.entries):
-                output_path = os.path.join(output_dir, entry['name'])
-                print(f"Extracting {entry['name']} in {output_path}")
-                if self.extract_entry(i, output_path):
-                    extracted_files.append(output_path)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = []
+                for i in indices:
+                    entry = self.entries[i]
+                    output_path = os.path.join(output_dir, names[i])
+                    print(f"Extracting {entry['name']} in {output_path}")
+                    futures.append(executor.submit(self.extract_entry_record, i, output_path,
+                                                   aggregate.part(), cancel, digests))
+                    
+                # Poll the token while the entries are copied, so that the
+                # entries not started yet are dropped as soon as it is cancelled
+                pending = set(futures)
+                while pending and cancel is not None:
+                    if cancel.cancelled:
+                        for future in pending:
+                            future.cancel()
+                        break
+                    _, pending = wait(pending, timeout=self.CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
                     
-            return extracted_files
+                for future in futures:
+                    if future.cancelled():
+                        continue
+                    record = future.result()
+                    if record is not None:
+                        records.append(record)
+                        
+            return records
             
         except Exception as e:
             print(f"Error during the extraction of all entries: {e}")
             import traceback
             traceback.print_exc()
-            return extracted_files
+            return records
     
     def get_info(self) -> Dict:
         """Return information about the SLB2 file"""
@@ -170,5 +362,5 @@ class SLB2File:
             'version': self.version,
             'flags': self.flags,
             'entries_count': len(self.entries),
-            'entries': self.entries
+            'entries': self.entries.to_dicts()
         } 
\ No newline at end of file
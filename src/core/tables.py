@@ -0,0 +1,234 @@
+from array import array
+from itertools import compress
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Segment flags (same bits as the PUP segment table)
+SEGMENT_IS_INFO = 1 << 0
+SEGMENT_IS_ENCRYPTED = 1 << 1
+SEGMENT_IS_SIGNED = 1 << 2
+SEGMENT_IS_COMPRESSED = 1 << 3
+SEGMENT_HAS_BLOCKS = 1 << 11
+SEGMENT_HAS_DIGESTS = 1 << 16
+# Not a PUP flag: segment made up by the analysis to explore the file
+SEGMENT_IS_SYNTHETIC = 1 << 32
+
+# Boolean fields of a segment and their bit in the flags
+SEGMENT_FLAG_FIELDS = {
+    'is_info': SEGMENT_IS_INFO,
+    'is_encrypted': SEGMENT_IS_ENCRYPTED,
+    'is_signed': SEGMENT_IS_SIGNED,
+    'is_compressed': SEGMENT_IS_COMPRESSED,
+    'has_blocks': SEGMENT_HAS_BLOCKS,
+    'has_digests': SEGMENT_HAS_DIGESTS,
+    'is_synthetic': SEGMENT_IS_SYNTHETIC
+}
+
+class _Row:
+    """
+    Lightweight view of one row of a columnar table.
+
+    Supports the dict-style access (row['offset'], row.get('name')) used by
+    the code that handled the tables as lists of dicts.
+    """
+    __slots__ = ('_table', '_index')
+    FIELDS = ()
+
+    def __init__(self, table, index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def keys(self):
+        return self.FIELDS
+
+    def to_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()})"
+
+def _column(name: str):
+    """Property reading and writing one column of the table"""
+    def getter(self):
+        return getattr(self._table, name)[self._index]
+
+    def setter(self, value):
+        getattr(self._table, name)[self._index] = value
+
+    return property(getter, setter)
+
+def _flag(bit: int):
+    """Boolean property backed by one bit of the flags column"""
+    def getter(self):
+        return bool(self._table.flags[self._index] & bit)
+
+    def setter(self, value):
+        if value:
+            self._table.flags[self._index] |= bit
+        else:
+            self._table.flags[self._index] &= ~bit
+
+    return property(getter, setter)
+
+class Segment(_Row):
+    """One segment of a SegmentTable"""
+    __slots__ = ()
+    FIELDS = ('offset', 'compressed_size', 'uncompressed_size', 'flags') + tuple(SEGMENT_FLAG_FIELDS)
+
+    offset = _column('offsets')
+    compressed_size = _column('compressed_sizes')
+    uncompressed_size = _column('uncompressed_sizes')
+    flags = _column('flags')
+
+for _name, _bit in SEGMENT_FLAG_FIELDS.items():
+    setattr(Segment, _name, _flag(_bit))
+
+class SegmentTable:
+    """
+    Columnar segment table.
+
+    Offsets and sizes are stored in typed arrays and all boolean attributes
+    in a single integer bitfield, instead of one dict per segment. Rows are
+    returned as Segment views.
+    """
+
+    def __init__(self, segments: Optional[Iterable[Dict]] = None):
+        self.offsets = array('Q')
+        self.compressed_sizes = array('Q')
+        self.uncompressed_sizes = array('Q')
+        self.flags = array('Q')
+        for segment in segments or ():
+            self.append(segment)
+
+    def append(self, segment: Dict) -> None:
+        """Add a segment given as a dict (or a Segment)"""
+        flags = segment.get('flags', 0)
+        for name, bit in SEGMENT_FLAG_FIELDS.items():
+            if segment.get(name, False):
+                flags |= bit
+
+        self.offsets.append(segment['offset'])
+        self.compressed_sizes.append(segment['compressed_size'])
+        self.uncompressed_sizes.append(segment['uncompressed_size'])
+        self.flags.append(flags)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> Segment:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Invalid segment index")
+        return Segment(self, index)
+
+    def __iter__(self) -> Iterator[Segment]:
+        return (Segment(self, i) for i in range(len(self)))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SegmentTable):
+            return NotImplemented
+        return (self.offsets == other.offsets and self.compressed_sizes == other.compressed_sizes and
+                self.uncompressed_sizes == other.uncompressed_sizes and self.flags == other.flags)
+
+    def select(self, include: int = 0, exclude: int = 0) -> List[int]:
+        """
+        Return the indices of the segments having all the include flags and
+        none of the exclude flags, e.g. select(SEGMENT_IS_COMPRESSED, SEGMENT_IS_ENCRYPTED)
+        """
+        mask = include | exclude
+        # Few distinct flag combinations exist: test each of them once, then
+        # match the flags column against them without a Python-level loop
+        matching = {flags for flags in set(self.flags) if flags & mask == include}
+        return list(compress(range(len(self)), map(matching.__contains__, self.flags)))
+
+    def sorted_indices(self, key: str = 'offset', reverse: bool = False) -> List[int]:
+        """Return the segment indices sorted by offset, compressed_size or uncompressed_size"""
+        column = {'offset': self.offsets,
+                  'compressed_size': self.compressed_sizes,
+                  'uncompressed_size': self.uncompressed_sizes}[key]
+        return sorted(range(len(self)), key=column.__getitem__, reverse=reverse)
+
+    def to_dicts(self) -> List[Dict]:
+        """Export the table as a list of dicts"""
+        # Few distinct flag combinations exist, decode each of them once
+        decoded_flags = {}
+        segments = []
+        for offset, compressed_size, uncompressed_size, flags in zip(
+                self.offsets, self.compressed_sizes, self.uncompressed_sizes, self.flags):
+            fields = decoded_flags.get(flags)
+            if fields is None:
+                fields = decoded_flags[flags] = {name: bool(flags & bit) for name, bit in SEGMENT_FLAG_FIELDS.items()}
+            segments.append({'offset': offset, 'compressed_size': compressed_size,
+                             'uncompressed_size': uncompressed_size, 'flags': flags, **fields})
+        return segments
+
+class Entry(_Row):
+    """One entry of an EntryTable"""
+    __slots__ = ()
+    FIELDS = ('start_sector', 'size', 'offset', 'name')
+
+    start_sector = _column('start_sectors')
+    size = _column('sizes')
+    offset = _column('offsets')
+    name = _column('names')
+
+class EntryTable:
+    """Columnar table of the entries of an SLB2 container"""
+
+    def __init__(self, entries: Optional[Iterable[Dict]] = None):
+        self.start_sectors = array('I')
+        self.sizes = array('Q')
+        self.offsets = array('Q')
+        self.names: List[str] = []
+        for entry in entries or ():
+            self.append(entry)
+
+    def append(self, entry: Dict) -> None:
+        """Add an entry given as a dict (or an Entry)"""
+        self.start_sectors.append(entry['start_sector'])
+        self.sizes.append(entry['size'])
+        self.offsets.append(entry['offset'])
+        self.names.append(entry['name'])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, index: int) -> Entry:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Invalid entry index")
+        return Entry(self, index)
+
+    def __iter__(self) -> Iterator[Entry]:
+        return (Entry(self, i) for i in range(len(self)))
+
+    def sorted_indices(self, key: str = 'offset', reverse: bool = False) -> List[int]:
+        """Return the entry indices sorted by start_sector, size, offset or name"""
+        column = {'start_sector': self.start_sectors, 'size': self.sizes,
+                  'offset': self.offsets, 'name': self.names}[key]
+        return sorted(range(len(self)), key=column.__getitem__, reverse=reverse)
+
+    def to_dicts(self) -> List[Dict]:
+        """Export the table as a list of dicts"""
+        return [
+            {'start_sector': start_sector, 'size': size, 'offset': offset, 'name': name}
+            for start_sector, size, offset, name
+            in zip(self.start_sectors, self.sizes, self.offsets, self.names)
+        ]
@@ -0,0 +1,215 @@
+import contextlib
+import io
+import lzma
+import os
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional
+from core.lzma_stream import LZMA_SIGNATURE, iter_lzma_decompress
+from core.mapped_file import MappedFile
+from core.progress import CancelToken, OperationCancelled, check_cancelled
+from core.pup_file import Pup
+from core.slb2_file import SLB2File
+from utils.instrumentation import count, span
+
+# Magic at the start of the data -> type, containers first
+MAGICS = (
+    (SLB2File.MAGIC, 'SLB2'),
+    (Pup.PS4_MAGIC, 'PUP'),
+    (Pup.PS5_MAGIC, 'PUP'),
+    (Pup.PS3_MAGIC, 'PUP'),
+    (b'\x7FELF', 'ELF'),
+    (b'\x89PNG', 'PNG'),
+    (b'\xFF\xD8\xFF', 'JPEG'),
+    (LZMA_SIGNATURE, 'LZMA')
+)
+
+CONTAINER_TYPES = ('SLB2', 'PUP')
+
+def detect_type(head) -> str:
+    """Type of the data starting with head (its first bytes)"""
+    head = bytes(head[:16])
+    for magic, kind in MAGICS:
+        if head.startswith(magic):
+            return kind
+    return 'data'
+
+class NestedUnpacker:
+    """
+    Walk a file and every container nested in it (PUP in SLB2, containers
+    in decompressed PUP segments...) in a single pass, and build an index of
+    everything found.
+
+    Each level is parsed in place over a SourceSlice of its parent, so
+    uncompressed data is never copied. A compressed segment is only
+    decompressed in full when its first output chunk shows a nested
+    container: it is then streamed to a temporary file, mapped while it is
+    walked and deleted, so memory use does not depend on its size.
+    With output_dir, the leaves (everything but the containers) are
+    streamed to output_dir/<container>/<item>.
+
+    Index records: path, type, size, offset (in the parent), file_offset
+    (in the file on disk, None for decompressed data), depth, compressed,
+    encrypted and output.
+    """
+
+    def __init__(self, max_depth: int = 8, output_dir: Optional[str] = None, verbose: bool = False):
+        self.max_depth = max_depth
+        self.output_dir = output_dir
+        self.verbose = verbose
+        self.index: List[Dict] = []
+
+    def unpack(self, file_path: str, cancel: Optional[CancelToken] = None) -> List[Dict]:
+        """Unpack a file, return the index (the records found before a cancellation)"""
+        self.index = []
+        try:
+            with span('unpack', file=file_path), MappedFile(file_path) as source:
+                self._walk(source, os.path.basename(file_path), 0, 0, cancel)
+        except OperationCancelled:
+            print("Unpacking cancelled")
+        except Exception as e:
+            print(f"Error during the unpacking of {file_path}: {e}")
+            import traceback
+            traceback.print_exc()
+        return self.index
+
+    def _record(self, path: str, kind: str, size: int, offset: int, source, depth: int,
+                compressed: bool = False, encrypted: bool = False) -> Dict:
+        file_offset = getattr(source, 'file_offset', 0)
+        record = {
+            'path': path,
+            'type': kind,
+            'size': size,
+            'offset': offset,
+            'file_offset': file_offset if not compressed else None,
+            'depth': depth,
+            'compressed': compressed,
+            'encrypted': encrypted,
+            'output': None
+        }
+        self.index.append(record)
+        count('items_indexed')
+        return record
+
+    def _quiet(self):
+        # The loaders report every step, too much for thousands of nested items
+        return contextlib.nullcontext() if self.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    def _walk(self, source, path: str, offset: int, depth: int, cancel: Optional[CancelToken],
+              compressed: bool = False, encrypted: bool = False) -> None:
+        """Index source (the data of the item at path) and, if it is a container, its items"""
+        check_cancelled(cancel)
+        kind = detect_type(source.view(0, 16))
+        record = self._record(path, kind, len(source), offset, source, depth, compressed, encrypted)
+
+        if kind not in CONTAINER_TYPES or depth >= self.max_depth:
+            self._write_leaf(record, [source.view(0)])
+            return
+
+        if kind == 'SLB2':
+            self._walk_slb2(source, path, depth, cancel)
+        else:
+            self._walk_pup(source, path, depth, cancel)
+
+    def _walk_slb2(self, source, path: str, depth: int, cancel: Optional[CancelToken]) -> None:
+        slb2 = SLB2File(path, source=source)
+        with self._quiet():
+            loaded = slb2.load(cancel=cancel)
+        if not loaded:
+            return
+
+        for entry in slb2.entries:
+            if entry['offset'] + entry['size'] > len(source):
+                continue
+            name = os.path.basename(entry['name']) or f"entry_{entry['start_sector']}"
+            with source.slice(entry['offset'], entry['size']) as entry_source:
+                self._walk(entry_source, f"{path}/{name}", entry['offset'], depth + 1, cancel)
+
+    def _walk_pup(self, source, path: str, depth: int, cancel: Optional[CancelToken]) -> None:
+        # Segments are walked once, caching them would only hold memory
+        pup = Pup(path, cache_size=0, source=source)
+        with self._quiet():
+            loaded = pup.load(cancel=cancel)
+        if not loaded:
+            return
+
+        try:
+            for i, segment in enumerate(pup.segment_table):
+                if segment.get('is_synthetic'):
+                    # Fake segments created to browse the file, not items of the PUP
+                    continue
+                item_path = f"{path}/segment_{i}.bin"
+                offset, size = segment['offset'], segment['compressed_size']
+                if offset + size > len(source):
+                    continue
+
+                if not segment['is_compressed'] or segment['is_encrypted']:
+                    with source.slice(offset, size) as segment_source:
+                        self._walk(segment_source, item_path, offset, depth + 1, cancel,
+                                   encrypted=segment['is_encrypted'])
+                    continue
+
+                self._walk_compressed(pup, i, item_path, offset, depth + 1, cancel)
+        finally:
+            pup.close()
+
+    def _walk_compressed(self, pup: Pup, index: int, path: str, offset: int, depth: int,
+                         cancel: Optional[CancelToken]) -> None:
+        """Index a compressed segment, decompressing it in full only if it holds a container"""
+        segment = pup.segment_table[index]
+        chunks = iter_lzma_decompress(pup.file_data, segment['offset'], segment['compressed_size'])
+        record = None
+        try:
+            first = next(chunks, b'')
+            kind = detect_type(first)
+            if kind in CONTAINER_TYPES and depth < self.max_depth:
+                with self._decompressed_file(self._chain(first, chunks), cancel) as mapped, \
+                        mapped.slice(0) as segment_source:
+                    # Decompressed data: its items have no location in the file on disk
+                    segment_source.file_path = segment_source.file_offset = None
+                    self._walk(segment_source, path, offset, depth, cancel, compressed=True)
+                return
+
+            record = self._record(path, kind, segment['uncompressed_size'], offset, None, depth, compressed=True)
+            self._write_leaf(record, self._chain(first, chunks), cancel)
+        except lzma.LZMAError as e:
+            print(f"Error during the decompression of {path}: {e}")
+            if record is None:
+                self._record(path, 'data', segment['compressed_size'], offset, None, depth, compressed=True)
+        finally:
+            chunks.close()
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _decompressed_file(chunks: Iterable[bytes], cancel: Optional[CancelToken]) -> Iterator[MappedFile]:
+        """Write the chunks to a temporary file and map it, the file is deleted afterwards"""
+        fd, temp_path = tempfile.mkstemp(prefix='pfu_', suffix='.bin')
+        try:
+            with span('decompress'), os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    check_cancelled(cancel)
+                    f.write(chunk)
+            with MappedFile(temp_path) as mapped:
+                yield mapped
+        finally:
+            try:
+                os.remove(temp_path)
+            except OSError as e:
+                print(f"Warning: Unable to delete the temporary file {temp_path}: {e}")
+
+    @staticmethod
+    def _chain(first: bytes, chunks: Iterable[bytes]) -> Iterable[bytes]:
+        yield first
+        yield from chunks
+
+    def _write_leaf(self, record: Dict, chunks: Iterable, cancel: Optional[CancelToken] = None) -> None:
+        """Stream the data of a leaf to the output directory, if any"""
+        if not self.output_dir:
+            return
+        output_path = os.path.join(self.output_dir, *record['path'].split('/')[1:] or [record['path']])
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        with span('write', item=record['path']), open(output_path, 'wb') as f:
+            for chunk in chunks:
+                check_cancelled(cancel)
+                f.write(chunk)
+                count('bytes_written', len(chunk))
+        record['output'] = output_path
@@ -0,0 +1,52 @@
+import numpy as np
+from typing import Dict, List, Optional
+from .entropy import block_statistics
+
+BLOCK_SIZE = 16
+# Entropy above which a block looks like a key or encrypted data
+HIGH_ENTROPY = 7.0
+# A key has almost all its bytes different
+KEY_MIN_DISTINCT = 12
+
+def block_view(data, offset: int = 0, count: Optional[int] = None) -> np.ndarray:
+    """Zero-copy (N, 16) view of the 16-byte blocks of data from offset (whole blocks only)"""
+    array = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data.reshape(-1)
+    blocks = max(0, (len(array) - offset) // BLOCK_SIZE)
+    if count is not None:
+        blocks = max(0, min(blocks, count))
+    return array[offset:offset + blocks * BLOCK_SIZE].reshape(blocks, BLOCK_SIZE)
+
+def classify_blocks(blocks: np.ndarray, high_entropy: float = HIGH_ENTROPY) -> Dict[str, np.ndarray]:
+    """
+    Classify all the rows of an (N, 16) block view at once.
+
+    Returns one array per statistic, indexed by block: entropy, distinct
+    (byte values), zero (all-zero block), encrypted (entropy above
+    high_entropy), key (potential key: encrypted, more than 12 distinct
+    bytes and not all zero) and confidence (that the block is a key).
+    The values are the ones of the block by block checks of PupAnalyzer.
+    """
+    entropies, distinct = block_statistics(blocks, blocks.shape[1])
+    zero = (distinct == 1) & (blocks[:, 0] == 0)
+    encrypted = entropies > high_entropy
+    return {
+        'entropy': entropies,
+        'distinct': distinct,
+        'zero': zero,
+        'encrypted': encrypted,
+        'key': encrypted & (distinct > KEY_MIN_DISTINCT) & ~zero,
+        'confidence': (np.minimum(1.0, entropies / 8.0) + np.minimum(1.0, distinct / 16.0)) / 2.0
+    }
+
+def mask_ranges(mask: np.ndarray, base_offset: int = 0, block_size: int = BLOCK_SIZE) -> np.ndarray:
+    """Runs of consecutive set blocks of mask as an (K, 2) array of [start, end) byte offsets"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return edges.reshape(-1, 2) * block_size + base_offset
+
+def merge_ranges(ranges: List[List[int]], new_ranges: np.ndarray) -> None:
+    """Append [start, end) ranges to a list, merging the first one with the last range if they touch"""
+    for start, end in new_ranges.tolist():
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
@@ -1,4 +1,3 @@
-from Crypto.Cipher import AES
 from typing import Tuple, Optional, Dict
 import struct
 from .pup_analyzer import PupAnalyzer
@@ -22,6 +21,8 @@ class PupDecryption:
         
     def decrypt_block(self, data: bytes, key: bytes, iv: bytes) -> bytes:
         """Decrypt a data block"""
+        from Crypto.Cipher import AES
+        
         cipher = AES.new(key, AES.MODE_CBC, iv)
         return cipher.decrypt(data)
         
@@ -69,21 +70,21 @@ class PupDecryption:
         
     def brute_force_decrypt(self, data: bytes, max_attempts: int = 1000) -> Optional[Tuple[bytes, bytes]]:
         """Try to decrypt the data by trying different keys"""
+        from .trial_decryption import candidate_ivs, first_likely, trial_decrypt
+        
         # Analyze the file to find possible keys
         analysis = self.analyzer.analyze_file(data)
         
         # Prova le chiavi sospette trovate dall'analisi
-        for key_info in analysis['suspected_keys']:
-            if key_info['confidence'] > 0.7:  # High confidence threshold
-                key = bytes.fromhex(key_info['key'])
-                # Try different IVs
-                for i in range(16):
-                    iv = bytes([i] * 16)
-                    success, _ = self.try_decrypt(data[:32], key, iv)
-                    if success:
-                        return key, iv
-                        
-        return None
+        keys = [bytes.fromhex(key_info['key']) for key_info in analysis['suspected_keys']
+                if key_info['confidence'] > 0.7]  # High confidence threshold
+        ivs = candidate_ivs()
+        
+        # Each key decrypts the first blocks once for all the IVs
+        found = first_likely(trial_decrypt(data[:32], keys, ivs)['likely'])
+        if found is None:
+            return None
+        return keys[found[0]], ivs[found[1]]
         
     def analyze_encryption(self, data: bytes) -> dict:
         """Analyze data to identify encryption patterns"""
@@ -112,16 +113,8 @@ class PupDecryption:
         
     def _calculate_entropy(self, data: bytes) -> float:
         """Calculate the entropy of a data block"""
-        if not data:
-            return 0.0
-            
-        counts = {}
-        for byte in data:
-            counts[byte] = counts.get(byte, 0) + 1
-            
-        length = len(data)
-        probabilities = [count / length for count in counts.values()]
-        return -sum(p * (p.bit_length() - 1) for p in probabilities)
+        from .entropy import entropy
+        return entropy(data)
         
     def _check_repeating_patterns(self, data: bytes) -> bool:
         """Check for repeating patterns"""
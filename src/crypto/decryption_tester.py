@@ -32,28 +32,28 @@ class DecryptionTester:
             if results['analysis']['encryption']['suspected']:
                 self.logger.info(f"Attempting decryption for {file_path}")
                 
-                # Try suspected keys
-                for key_info in results['analysis']['suspected_keys']:
-                    if key_info['confidence'] > 0.7:
-                        key = bytes.fromhex(key_info['key'])
-                        for i in range(16):
-                            iv = bytes([i] * 16)
-                            success, decrypted = self.decryption.try_decrypt(data[:32], key, iv)
-                            
-                            results['decryption_attempts'].append({
-                                'key': key_info['key'],
-                                'iv': binascii.hexlify(iv).decode(),
-                                'success': success
-                            })
-                            
-                            if success:
-                                results['success'] = True
-                                results['key'] = key_info['key']
-                                results['iv'] = binascii.hexlify(iv).decode()
-                                break
-                                
-                        if results['success']:
-                            break
+                # Try suspected keys, all the IVs of a key at once
+                from .trial_decryption import candidate_ivs, first_likely, trial_decrypt
+                key_hexes = [key_info['key'] for key_info in results['analysis']['suspected_keys']
+                             if key_info['confidence'] > 0.7]
+                ivs = candidate_ivs()
+                likely = trial_decrypt(data[:32], [bytes.fromhex(key) for key in key_hexes], ivs)['likely']
+                found = first_likely(likely)
+                
+                # Attempts in key then IV order, up to the first success
+                attempts = likely.size if found is None else found[0] * len(ivs) + found[1] + 1
+                for attempt in range(attempts):
+                    key_index, iv_index = divmod(attempt, len(ivs))
+                    results['decryption_attempts'].append({
+                        'key': key_hexes[key_index],
+                        'iv': binascii.hexlify(ivs[iv_index]).decode(),
+                        'success': bool(likely[key_index, iv_index])
+                    })
+                    
+                if found is not None:
+                    results['success'] = True
+                    results['key'] = key_hexes[found[0]]
+                    results['iv'] = binascii.hexlify(ivs[found[1]]).decode()
                             
             return results
             
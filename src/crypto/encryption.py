@@ -1,6 +1,5 @@
 from typing import Tuple
 import struct
-from Crypto.Cipher import AES
 import os
 
 class PupEncryption:
@@ -17,6 +16,8 @@ class PupEncryption:
         
     def encrypt_block(self, data: bytes, key: bytes, iv: bytes) -> bytes:
         """Encrypt a data block"""
+        from Crypto.Cipher import AES
+        
         cipher = AES.new(key, AES.MODE_CBC, iv)
         # Padding the data to be a multiple of 16 bytes
         pad_length = 16 - (len(data) % 16)
@@ -26,6 +27,8 @@ class PupEncryption:
         
     def decrypt_block(self, data: bytes, key: bytes, iv: bytes) -> bytes:
         """Decrypt a data block"""
+        from Crypto.Cipher import AES
+        
         cipher = AES.new(key, AES.MODE_CBC, iv)
         decrypted_data = cipher.decrypt(data)
         # Remove the padding
@@ -53,13 +56,5 @@ class PupEncryption:
 
     def _calculate_entropy(self, data: bytes) -> float:
         """Calculate the entropy of a data block"""
-        if not data:
-            return 0.0
-            
-        counts = {}
-        for byte in data:
-            counts[byte] = counts.get(byte, 0) + 1
-            
-        length = len(data)
-        probabilities = [count / length for count in counts.values()]
-        return -sum(p * (p.bit_length() - 1) for p in probabilities)
\ No newline at end of file
+        from .entropy import entropy
+        return entropy(data)
\ No newline at end of file
@@ -0,0 +1,139 @@
+import numpy as np
+from typing import Optional, Tuple
+
+# Blocks up to this size are measured by sorting their bytes (run lengths),
+# larger ones with a histogram of the 256 byte values
+RUN_LENGTH_MAX_BLOCK = 64
+# Elements processed at a time, bounds the temporary arrays (~16-32MB)
+BATCH_ELEMENTS = 1 << 22
+# Rows longer than this are counted in pieces (a single huge block)
+ROW_PIECE = 1 << 24
+
+def _as_array(data) -> np.ndarray:
+    """Zero-copy uint8 array over bytes, bytearray, memoryview or mmap"""
+    if isinstance(data, np.ndarray):
+        return data.reshape(-1).view(np.uint8)
+    return np.frombuffer(data, dtype=np.uint8)
+
+def _run_length_entropy(rows: np.ndarray, distinct: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Entropy of small blocks: the bytes of each block are sorted, so equal
+    values form runs. The k-th byte of a run adds f(k) - f(k-1), where
+    f(c) = -(c/B) * log2(c/B) is the term of a value seen c times, and the
+    terms of each run telescope to f(c) without counting the runs.
+    The number of runs (distinct byte values) is stored in distinct if given.
+    """
+    block_size = rows.shape[1]
+    c = np.arange(block_size + 1)
+    f = np.zeros(block_size + 1)
+    f[1:] = -(c[1:] / block_size) * np.log2(c[1:] / block_size)
+    step = np.zeros(block_size + 1)
+    step[1:] = np.diff(f)
+    positions = np.arange(block_size, dtype=np.int8)
+
+    result = np.empty(len(rows))
+    batch = max(1, BATCH_ELEMENTS // block_size)
+    for start in range(0, len(rows), batch):
+        chunk = np.sort(rows[start:start + batch], axis=1)
+        # Position of the first byte of the run of each byte
+        run_start = np.zeros(chunk.shape, dtype=np.int8)
+        run_start[:, 1:] = positions[1:]
+        changes = chunk[:, 1:] != chunk[:, :-1]
+        run_start[:, 1:] *= changes
+        if distinct is not None:
+            distinct[start:start + batch] = changes.sum(axis=1) + 1
+        np.maximum.accumulate(run_start, axis=1, out=run_start)
+        result[start:start + batch] = step[positions - run_start + 1].sum(axis=1)
+    return result
+
+def _row_histograms(rows: np.ndarray) -> np.ndarray:
+    """Byte histograms (rows, 256) of the rows of a 2D uint8 array"""
+    block_size = rows.shape[1]
+    if block_size > ROW_PIECE:
+        # One row at a time, counted piece by piece
+        histograms = np.zeros((len(rows), 256), dtype=np.int64)
+        for i, row in enumerate(rows):
+            for start in range(0, block_size, ROW_PIECE):
+                histograms[i] += np.bincount(row[start:start + ROW_PIECE], minlength=256)
+        return histograms
+
+    # Row r counts its bytes in bins [256 * r, 256 * r + 256)
+    bins = (np.arange(len(rows), dtype=np.intp)[:, None] * 256 + rows).ravel()
+    return np.bincount(bins, minlength=len(rows) * 256).reshape(len(rows), 256)
+
+def histogram_entropy(histograms: np.ndarray, sizes) -> np.ndarray:
+    """Entropy of each row of byte histograms; sizes is the byte count of each row (or of all of them)"""
+    sizes = np.asarray(sizes, dtype=np.float64)
+    if sizes.ndim == 1:
+        sizes = sizes[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = histograms / sizes
+        terms = np.where(p > 0, -p * np.log2(p), 0.0)
+    return terms.sum(axis=1)
+
+def _histogram_entropy(rows: np.ndarray, distinct: Optional[np.ndarray] = None) -> np.ndarray:
+    """Entropy of large blocks from their byte histograms, one batched bincount per group of rows"""
+    block_size = rows.shape[1]
+    result = np.empty(len(rows))
+    batch = max(1, BATCH_ELEMENTS // block_size)
+    for start in range(0, len(rows), batch):
+        histograms = _row_histograms(rows[start:start + batch])
+        result[start:start + batch] = histogram_entropy(histograms, block_size)
+        if distinct is not None:
+            distinct[start:start + batch] = np.count_nonzero(histograms, axis=1)
+    return result
+
+def block_histograms(data, block_size: int, count: Optional[int] = None) -> np.ndarray:
+    """Byte histograms (blocks, 256) of the whole blocks of data"""
+    rows = _block_rows(data, block_size, count)
+    histograms = np.empty((len(rows), 256), dtype=np.int64)
+    batch = max(1, BATCH_ELEMENTS // block_size)
+    for start in range(0, len(rows), batch):
+        histograms[start:start + batch] = _row_histograms(rows[start:start + batch])
+    return histograms
+
+def _block_rows(data, block_size: int, count: Optional[int] = None) -> np.ndarray:
+    """(blocks, block_size) view of the whole blocks of data"""
+    array = _as_array(data)
+    blocks = len(array) // block_size
+    if count is not None:
+        blocks = max(0, min(blocks, count))
+    return array[:blocks * block_size].reshape(blocks, block_size)
+
+def block_entropy(data, block_size: int = 16, count: Optional[int] = None) -> np.ndarray:
+    """
+    Shannon entropy (bits per byte) of consecutive blocks of data, in a
+    single vectorized pass over a (blocks, block_size) view of the buffer.
+
+    Only whole blocks are measured; count limits the number of blocks.
+    The result of a block only depends on its bytes and block_size, so
+    entropy(block) returns exactly the same value as this function.
+    """
+    rows = _block_rows(data, block_size, count)
+    if len(rows) == 0:
+        return np.zeros(0)
+
+    if block_size <= RUN_LENGTH_MAX_BLOCK:
+        return _run_length_entropy(rows)
+    return _histogram_entropy(rows)
+
+def block_statistics(data, block_size: int = 16, count: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Entropy and number of distinct byte values of consecutive blocks of
+    data, both from the same pass. The entropies are those of block_entropy.
+    """
+    rows = _block_rows(data, block_size, count)
+    distinct = np.zeros(len(rows), dtype=np.int64)
+    if len(rows) == 0:
+        return np.zeros(0), distinct
+
+    if block_size <= RUN_LENGTH_MAX_BLOCK:
+        return _run_length_entropy(rows, distinct), distinct
+    return _histogram_entropy(rows, distinct), distinct
+
+def entropy(data) -> float:
+    """Shannon entropy (bits per byte) of a whole buffer"""
+    length = len(_as_array(data))
+    if length == 0:
+        return 0.0
+    return float(block_entropy(data, length)[0])
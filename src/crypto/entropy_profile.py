@@ -0,0 +1,339 @@
+import hashlib
+import os
+import zipfile
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from core.mapped_file import MappedFile
+from core.progress import CancelToken, OperationCancelled, ProgressCallback, check_cancelled
+from utils.instrumentation import count, span
+from .entropy import block_entropy, block_histograms, entropy, histogram_entropy
+
+# Block sizes of the levels, finest first
+LEVELS = (16, 0x1000, 0x10000, 0x100000)  # 16B, 4KB, 64KB, 1MB
+# The 16B level would take 1/8 of the file: it is computed from the file
+# for the requested window instead of being built and stored
+FINE_LEVEL = LEVELS[0]
+STORED_LEVELS = LEVELS[1:]
+# Levels whose byte histograms are kept for the range queries
+HISTOGRAM_LEVEL = 0x10000
+CUMULATIVE_LEVEL = 0x100000
+# Bytes processed at a time while building, a multiple of every level
+BUILD_CHUNK = 0x1000000  # 16MB
+
+# Bump when the stored arrays change, so that old sidecars are rebuilt
+PROFILE_VERSION = 2
+SIDECAR_SUFFIX = '.entropy.npz'
+# Used when the directory of the file is not writable, can be overridden with PFU_ENTROPY_CACHE
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pfu', 'entropy')
+
+class EntropyProfile:
+    """
+    Entropy of a whole file at several resolutions (16B, 4KB, 64KB, 1MB).
+
+    The profile is built in one pass over the file and stores, for the 4KB
+    and larger levels, the entropy of every block (the last block may be
+    partial), so a map of a multi-GB image is read instead of being
+    computed. The 16B level is computed from the file for the window
+    asked (see level). The byte histograms of the 64KB blocks and their
+    prefix sums per 1MB block are kept as well: the exact entropy of a
+    range is then answered from at most one difference of prefix sums, a
+    few 64KB histograms and the two unaligned edges, up to 64KB each, read
+    from the file.
+
+    Profiles of files are cached in a sidecar next to the file (see
+    for_file), keyed by its size and modification time.
+    """
+
+    def __init__(self, size: int, levels: Dict[int, np.ndarray], histograms: np.ndarray,
+                 cumulative: np.ndarray, source=None, file_path: Optional[str] = None):
+        self.size = size
+        self.levels = levels
+        self.histograms = histograms
+        self.cumulative = cumulative
+        self.source = source
+        self.file_path = file_path
+        self._owned_source: Optional[MappedFile] = None
+
+    @classmethod
+    def build(cls, source, progress: Optional[ProgressCallback] = None,
+              cancel: Optional[CancelToken] = None) -> 'EntropyProfile':
+        """
+        Build the profile of a source (MappedFile, SourceSlice, bytes).
+
+        progress(done, total) is called after each chunk; raises
+        OperationCancelled once cancel is cancelled.
+        """
+        data = source.view(0) if hasattr(source, 'view') else memoryview(source)
+        size = len(data)
+        parts: List[np.ndarray] = []
+        histogram_parts = []
+
+        with span('entropy_profile', size=size):
+            for start in range(0, size, BUILD_CHUNK):
+                check_cancelled(cancel)
+                chunk = data[start:start + BUILD_CHUNK]
+                parts.append(block_entropy(chunk, LEVELS[1]))
+                histogram_parts.append(block_histograms(chunk, HISTOGRAM_LEVEL))
+                count('bytes_profiled', len(chunk))
+                if progress:
+                    progress(start + len(chunk), size)
+
+            # The last block of each level holds the bytes left after the whole blocks
+            tail = data[size - size % LEVELS[1]:]
+            if len(tail):
+                parts.append(np.array([entropy(tail)]))
+            tail = data[size - size % HISTOGRAM_LEVEL:]
+            if len(tail):
+                histogram_parts.append(np.bincount(np.frombuffer(tail, dtype=np.uint8), minlength=256)[None, :])
+
+        histograms = np.concatenate(histogram_parts) if histogram_parts else np.zeros((0, 256), dtype=np.int64)
+        histograms = histograms.astype(np.uint32)
+
+        # 1MB histograms as sums of 16 rows of 64KB, then their prefix sums
+        group = CUMULATIVE_LEVEL // HISTOGRAM_LEVEL
+        groups = -(-len(histograms) // group)
+        padded = np.zeros((groups * group, 256), dtype=np.int64)
+        padded[:len(histograms)] = histograms
+        large = padded.reshape(groups, group, 256).sum(axis=1)
+        cumulative = np.zeros((groups + 1, 256), dtype=np.int64)
+        np.cumsum(large, axis=0, out=cumulative[1:])
+
+        levels = {
+            LEVELS[1]: np.concatenate(parts).astype(np.float32) if parts else np.zeros(0, np.float32),
+            HISTOGRAM_LEVEL: histogram_entropy(histograms, cls._block_sizes(size, HISTOGRAM_LEVEL)).astype(np.float32),
+            CUMULATIVE_LEVEL: histogram_entropy(large, cls._block_sizes(size, CUMULATIVE_LEVEL)).astype(np.float32)
+        }
+        return cls(size, levels, histograms, cumulative, source, getattr(source, 'file_path', None))
+
+    @staticmethod
+    def _block_sizes(size: int, block_size: int) -> np.ndarray:
+        """Bytes in each block of a level, the last one may be partial"""
+        sizes = np.full(-(-size // block_size), block_size, dtype=np.int64)
+        if size % block_size:
+            sizes[-1] = size % block_size
+        return sizes
+
+    @classmethod
+    def for_file(cls, file_path: str, use_cache: bool = True, progress: Optional[ProgressCallback] = None,
+                 cancel: Optional[CancelToken] = None) -> Optional['EntropyProfile']:
+        """
+        Return the profile of a file, from its sidecar if it is up to date,
+        otherwise built and stored in the sidecar. None if the build is
+        cancelled or fails.
+        """
+        if use_cache:
+            profile = cls.load(file_path)
+            if profile is not None:
+                print(f"Entropy profile loaded from {profile.sidecar_path(file_path)}")
+                if progress:
+                    progress(profile.size, profile.size)
+                return profile
+
+        source = MappedFile(file_path)
+        try:
+            source.open()
+            profile = cls.build(source, progress, cancel)
+        except OperationCancelled:
+            print("Entropy profile cancelled")
+            source.close()
+            return None
+        except Exception as e:
+            print(f"Error while building the entropy profile: {e}")
+            import traceback
+            traceback.print_exc()
+            source.close()
+            return None
+
+        profile._owned_source = source
+        if use_cache:
+            profile.save(file_path)
+        return profile
+
+    @staticmethod
+    def sidecar_path(file_path: str) -> str:
+        """Sidecar next to the file, or in the cache directory if that one is not writable"""
+        directory = os.path.dirname(os.path.abspath(file_path))
+        if os.access(directory, os.W_OK):
+            return os.path.abspath(file_path) + SIDECAR_SUFFIX
+        cache_dir = os.environ.get('PFU_ENTROPY_CACHE') or DEFAULT_CACHE_DIR
+        name = hashlib.blake2b(os.path.abspath(file_path).encode(), digest_size=16).hexdigest()
+        return os.path.join(cache_dir, name + SIDECAR_SUFFIX)
+
+    @staticmethod
+    def _file_identity(file_path: str) -> np.ndarray:
+        stats = os.stat(file_path)
+        return np.array([PROFILE_VERSION, stats.st_size, stats.st_mtime_ns], dtype=np.int64)
+
+    def save(self, file_path: str) -> bool:
+        """Store the profile in the sidecar of file_path"""
+        path = self.sidecar_path(file_path)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            arrays = {f"level_{block_size}": values for block_size, values in self.levels.items()}
+            # Write to a temporary file first, readers never see partial profiles
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                np.savez(f, identity=self._file_identity(file_path), histograms=self.histograms,
+                         cumulative=self.cumulative, **arrays)
+            os.replace(temp_path, path)
+            return True
+        except OSError as e:
+            print(f"Unable to store the entropy profile: {e}")
+            return False
+
+    @classmethod
+    def load(cls, file_path: str) -> Optional['EntropyProfile']:
+        """
+        Return the profile stored in the sidecar of file_path, None if
+        missing or stale. A truncated or corrupt sidecar is deleted, so
+        that for_file builds and stores the profile again.
+        """
+        path = cls.sidecar_path(file_path)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as stored:
+                if not np.array_equal(stored['identity'], cls._file_identity(file_path)):
+                    return None
+                levels = {block_size: stored[f"level_{block_size}"] for block_size in STORED_LEVELS}
+                profile = cls(int(stored['identity'][1]), levels, stored['histograms'], stored['cumulative'],
+                              file_path=file_path)
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as e:
+            print(f"Warning: Discarding the unreadable entropy profile {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return profile
+
+    def level(self, block_size: int, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """
+        Entropy of the blocks of a level (16, 4096, 65536 or 1048576 bytes)
+        that overlap the bytes [start, end), by default the whole file. The
+        16B level is computed from the file, BUILD_CHUNK bytes at a time, so
+        ask it for the window actually shown.
+        """
+        if block_size not in LEVELS:
+            raise ValueError(f"No level with {block_size} byte blocks, available: {LEVELS}")
+        end = self.size if end is None else min(end, self.size)
+        first, last = max(0, start) // block_size, -(-end // block_size)
+        if block_size != FINE_LEVEL:
+            return self.levels[block_size][first:last]
+
+        parts = []
+        window_end = min(last * FINE_LEVEL, self.size)
+        for position in range(first * FINE_LEVEL, window_end, BUILD_CHUNK):
+            data = self._read(position, min(position + BUILD_CHUNK, window_end))
+            parts.append(block_entropy(data, FINE_LEVEL))
+            # Only the last block of the file can be partial
+            if len(data) % FINE_LEVEL:
+                parts.append(np.array([entropy(data[-(len(data) % FINE_LEVEL):])]))
+        return np.concatenate(parts).astype(np.float32) if parts else np.zeros(0, np.float32)
+
+    def map(self, width: int) -> Tuple[int, np.ndarray]:
+        """
+        Entropy map of the file in at most width columns, from the coarsest
+        level that still has width blocks (the finest one for small files).
+        Returns (block_size, values); each column is the maximum of its
+        blocks, so small encrypted regions stay visible.
+        """
+        block_size = LEVELS[0]
+        for candidate in LEVELS:
+            if -(-self.size // candidate) >= width:
+                block_size = candidate
+        # The 16B level is only used for files smaller than width 4KB blocks
+        values = self.level(block_size).astype(np.float32)
+        if len(values) <= width:
+            return block_size, values
+        edges = np.linspace(0, len(values), width + 1).astype(np.int64)
+        return block_size, np.maximum.reduceat(values, edges[:-1])
+
+    def ranges_above(self, threshold: float, block_size: int = 0x1000) -> List[Tuple[int, int]]:
+        """Byte ranges [start, end) whose blocks of a level have an entropy above threshold"""
+        ranges: List[Tuple[int, int]] = []
+        # The 16B level is computed window by window, the others are stored whole
+        window = BUILD_CHUNK if block_size == FINE_LEVEL else max(self.size, 1)
+        for window_start in range(0, self.size, window):
+            above = self.level(block_size, window_start, window_start + window) > threshold
+            # Run boundaries of the blocks above the threshold
+            changes = np.flatnonzero(np.diff(np.concatenate(([False], above, [False])).astype(np.int8)))
+            for start, end in zip(changes[::2], changes[1::2]):
+                start = window_start + int(start) * block_size
+                end = min(window_start + int(end) * block_size, self.size)
+                if ranges and ranges[-1][1] == start:
+                    # Run continued from the previous window
+                    ranges[-1] = (ranges[-1][0], end)
+                else:
+                    ranges.append((start, end))
+        return ranges
+
+    def range_histogram(self, start: int, end: int) -> np.ndarray:
+        """Byte histogram of [start, end) of the file"""
+        start, end = max(0, start), min(end, self.size)
+        histogram = np.zeros(256, dtype=np.int64)
+        if start >= end:
+            return histogram
+
+        # Whole 1MB blocks: one difference of prefix sums
+        first, last = self._whole_blocks(start, end, CUMULATIVE_LEVEL)
+        if first < last:
+            histogram += self.cumulative[last] - self.cumulative[first]
+            pieces = [(start, first * CUMULATIVE_LEVEL), (min(last * CUMULATIVE_LEVEL, self.size), end)]
+        else:
+            pieces = [(start, end)]
+
+        for piece_start, piece_end in pieces:
+            if piece_start >= piece_end:
+                continue
+            # Whole 64KB blocks (fewer than 16 on each side of the 1MB blocks)
+            first, last = self._whole_blocks(piece_start, piece_end, HISTOGRAM_LEVEL)
+            if first < last:
+                histogram += self.histograms[first:last].sum(axis=0, dtype=np.int64)
+                edges = [(piece_start, first * HISTOGRAM_LEVEL),
+                         (min(last * HISTOGRAM_LEVEL, self.size), piece_end)]
+            else:
+                edges = [(piece_start, piece_end)]
+            for edge_start, edge_end in edges:
+                if edge_start < edge_end:
+                    histogram += np.bincount(np.frombuffer(self._read(edge_start, edge_end), dtype=np.uint8),
+                                             minlength=256)
+        return histogram
+
+    def _whole_blocks(self, start: int, end: int, block_size: int) -> Tuple[int, int]:
+        """Blocks [first, last) of a level that lie inside [start, end)"""
+        first = -(-start // block_size)
+        last = end // block_size if end < self.size else -(-self.size // block_size)
+        return first, last
+
+    def range_entropy(self, start: int, end: int) -> float:
+        """Exact entropy of the bytes [start, end) of the file"""
+        histogram = self.range_histogram(start, end)
+        total = int(histogram.sum())
+        if total == 0:
+            return 0.0
+        return float(histogram_entropy(histogram[None, :], total)[0])
+
+    def _read(self, start: int, end: int) -> bytes:
+        """Bytes of the file for the edges of a range query and for the 16B level"""
+        if self.source is None:
+            if not self.file_path:
+                raise ValueError("The profile has no source to read the edges of the range from")
+            self._owned_source = MappedFile(self.file_path)
+            self._owned_source.open()
+            self.source = self._owned_source
+        view = self.source.view(start, end) if hasattr(self.source, 'view') else memoryview(self.source)[start:end]
+        return bytes(view)
+
+    def close(self) -> None:
+        """Release the file mapped for the range queries"""
+        self.source = None
+        if self._owned_source:
+            self._owned_source.close()
+            self._owned_source = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
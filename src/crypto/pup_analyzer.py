@@ -1,9 +1,17 @@
 import struct
-from typing import Dict, List, Tuple
-from Crypto.Cipher import AES
+from typing import Dict, List, Optional, Tuple
 import binascii
+from utils.instrumentation import count, span
+
+# NumPy (.entropy, .block_classifier) is imported by the methods that use it:
+# loading it takes longer than the rest of the analyzer
 
 class PupAnalyzer:
+    # Entropy above which a block looks like a key or encrypted data
+    HIGH_ENTROPY = 7.0
+    # Bytes of blocks analyzed at a time by the single pass (multiple of 16)
+    SCAN_CHUNK = 0x400000  # 4MB
+    
     def __init__(self):
         self.known_patterns = {
             'header': {
@@ -20,21 +28,45 @@ class PupAnalyzer:
             }
         }
         
-    def analyze_file(self, data: bytes) -> Dict:
-        """Analyze PUP file to identify patterns and possible encryption keys"""
-        analysis = {
-            'header': self._analyze_header(data),
-            'encryption': self._analyze_encryption(data),
-            'patterns': self._find_patterns(data),
-            'suspected_keys': self._find_suspected_keys(data)
-        }
+    def analyze_file(self, data: bytes, compact: bool = False) -> Dict:
+        """
+        Analyze PUP file to identify patterns and possible encryption keys.
+        
+        data can be bytes or any buffer (memoryview, mmap): it is read once
+        by _scan_blocks, whose block statistics feed every detector.
+        
+        With compact, the high entropy blocks are reported as merged ranges
+        instead of one dict per block: encryption['encrypted_ranges'] lists
+        [start, end) offsets and patterns has one 'potential_key_range'
+        (offset, size) per range. Use it for whole encrypted images, where
+        nearly every block would get a dict.
+        """
+        with span('analyze', size=len(data)):
+            scan = self._scan_blocks(data, compact)
+            analysis = {
+                'header': self._analyze_header(data),
+                'encryption': self._analyze_encryption(data, scan['blocks']),
+                'patterns': scan['patterns'],
+                'suspected_keys': scan['suspected_keys']
+            }
+        count('bytes_analyzed', len(data))
         return analysis
         
+    def analyze_source(self, source, offset: int = 0, length: Optional[int] = None, compact: bool = False) -> Dict:
+        """
+        Analyze the range [offset, offset + length) of a source (MappedFile,
+        SourceSlice of a container, bytes) without reading the rest of it.
+        Offsets in the results are relative to the start of the range.
+        """
+        end = None if length is None else offset + length
+        view = source.view(offset, end) if hasattr(source, 'view') else memoryview(source)[offset:end]
+        return self.analyze_file(view, compact)
+        
     def _analyze_header(self, data: bytes) -> Dict:
         """Analyze PUP file header"""
         header = {}
         try:
-            header['magic'] = data[:8]
+            header['magic'] = bytes(data[:8])
             header['version'] = struct.unpack("<I", data[8:12])[0]
             header['mode'] = struct.unpack("<I", data[12:16])[0]
             header['entry_table_offset'] = struct.unpack("<Q", data[32:40])[0]
@@ -43,8 +75,8 @@ class PupAnalyzer:
             header['error'] = str(e)
         return header
         
-    def _analyze_encryption(self, data: bytes) -> Dict:
-        """Analyze data to identify possible encryption"""
+    def _analyze_encryption(self, data: bytes, blocks: Optional[Dict] = None) -> Dict:
+        """Analyze data to identify possible encryption (blocks: _analyze_blocks(data[32:]) if already known)"""
         encryption = {
             'suspected': False,
             'block_size': 16,
@@ -58,57 +90,119 @@ class PupAnalyzer:
             encryption['patterns'].append('high_entropy')
             
         # Repeating patterns analysis
-        if self._check_repeating_patterns(data[32:64]):
+        if self._check_repeating_patterns(bytes(data[32:64])):
             encryption['patterns'].append('repeating_patterns')
             
         # Blocks analysis
-        blocks = self._analyze_blocks(data[32:])
+        if blocks is None:
+            blocks = self._analyze_blocks(data[32:])
         if blocks['suspected_encryption']:
             encryption['suspected'] = True
             encryption['patterns'].extend(blocks['patterns'])
+        if 'ranges' in blocks:
+            encryption['encrypted_ranges'] = blocks['ranges']
             
         return encryption
         
-    def _find_patterns(self, data: bytes) -> List[Dict]:
-        """Search known patterns in data"""
-        patterns = []
-        
-        # Search known header patterns
-        for offset in range(0, len(data) - 8, 8):
-            if data[offset:offset+8] == self.known_patterns['header']['magic']:
-                patterns.append({
-                    'type': 'header_magic',
-                    'offset': offset,
-                    'data': binascii.hexlify(data[offset:offset+8]).decode()
-                })
-                
-        # Search encryption patterns
-        for offset in range(32, len(data) - 16, 16):
-            block = data[offset:offset+16]
-            if self._is_potential_key_block(block):
-                patterns.append({
-                    'type': 'potential_key_block',
-                    'offset': offset,
-                    'data': binascii.hexlify(block).decode()
-                })
-                
-        return patterns
+    def _scan_blocks(self, data: bytes, compact: bool = False) -> Dict:
+        """
+        Single pass over data for all the detectors.
         
-    def _find_suspected_keys(self, data: bytes) -> List[Dict]:
-        """Search possible encryption keys"""
+        The 16-byte blocks at offsets 32, 48... (the last one ending before
+        the end of the data) are classified chunk by chunk over a zero-copy
+        view (see classify_blocks), and the header magic is compared at the
+        8-byte aligned offsets. Returns the results of
+        _analyze_blocks(data[32:]), _find_patterns(data) and
+        _find_suspected_keys(data), or their merged ranges with compact.
+        """
+        import numpy as np
+        from .block_classifier import block_view, classify_blocks, mask_ranges, merge_ranges
+        
+        array = np.frombuffer(data, dtype=np.uint8)
+        size = len(array)
+        magic = self.known_patterns['header']['magic']
+        magic_word = np.frombuffer(magic, dtype=np.uint64)[0]
+        
+        # Same ranges as the block by block loops
+        words = len(range(0, size - 8, 8))
+        blocks_count = len(range(32, size - 16, 16))
+        key_blocks_count = len(range(32, min(1024, size - 16), 16))
+        
+        blocks = {
+            'suspected_encryption': False,
+            'patterns': []
+        }
+        magic_patterns = []
+        key_block_patterns = []
+        encrypted_ranges = []
         keys = []
         
-        # Analyze first 1024 bytes for possible keys
-        for offset in range(32, min(1024, len(data) - 16), 16):
-            block = data[offset:offset+16]
-            if self._is_potential_key(block):
+        for start in range(0, size, self.SCAN_CHUNK):
+            end = min(size, start + self.SCAN_CHUNK)
+            
+            # Header magic, one 64-bit comparison per aligned offset
+            first, last = start // 8, min(words, -(-end // 8))
+            if last > first:
+                matches = np.flatnonzero(array[8 * first:8 * last].view(np.uint64) == magic_word)
+                for index in matches:
+                    offset = 8 * (first + int(index))
+                    magic_patterns.append({
+                        'type': 'header_magic',
+                        'offset': offset,
+                        'data': binascii.hexlify(magic).decode()
+                    })
+                    
+            # Blocks starting in this chunk
+            first = max(0, (start - 32) // 16)
+            last = min(blocks_count, max(0, -(-(end - 32) // 16)))
+            if last <= first:
+                continue
+            base_offset = 32 + 16 * first
+            rows = block_view(array, base_offset, last - first)
+            classes = classify_blocks(rows, self.HIGH_ENTROPY)
+            
+            if compact:
+                merge_ranges(encrypted_ranges, mask_ranges(classes['encrypted'], base_offset))
+            else:
+                for index in np.flatnonzero(classes['encrypted']):
+                    offset = base_offset + 16 * int(index)
+                    blocks['patterns'].append({
+                        'offset': offset - 32,
+                        'type': 'encrypted_block',
+                        'entropy': float(classes['entropy'][index])
+                    })
+                    key_block_patterns.append({
+                        'type': 'potential_key_block',
+                        'offset': offset,
+                        'data': rows[index].tobytes().hex()
+                    })
+                    
+            # Possible keys in the first 1024 bytes
+            for index in np.flatnonzero(classes['key'][:max(0, key_blocks_count - first)]):
                 keys.append({
-                    'offset': offset,
-                    'key': binascii.hexlify(block).decode(),
-                    'confidence': self._calculate_key_confidence(block)
+                    'offset': base_offset + 16 * int(index),
+                    'key': rows[index].tobytes().hex(),
+                    'confidence': float(classes['confidence'][index])
                 })
                 
-        return sorted(keys, key=lambda x: x['confidence'], reverse=True)
+        if compact:
+            blocks['ranges'] = encrypted_ranges
+            key_block_patterns = [{'type': 'potential_key_range', 'offset': start, 'size': end - start}
+                                  for start, end in encrypted_ranges]
+        blocks['suspected_encryption'] = bool(blocks['patterns'] or encrypted_ranges)
+        return {
+            'blocks': blocks,
+            'patterns': magic_patterns + key_block_patterns,
+            'suspected_keys': sorted(keys, key=lambda x: x['confidence'], reverse=True)
+        }
+        
+    def _find_patterns(self, data: bytes) -> List[Dict]:
+        """Search known patterns in data"""
+        return self._scan_blocks(data)['patterns']
+        
+    def _find_suspected_keys(self, data: bytes) -> List[Dict]:
+        """Search possible encryption keys"""
+        return self._scan_blocks(data)['suspected_keys']
         
     def _analyze_blocks(self, data: bytes) -> Dict:
         """Analyze data blocks for encryption patterns"""
@@ -117,30 +211,24 @@ class PupAnalyzer:
             'patterns': []
         }
         
-        for i in range(0, len(data) - 16, 16):
-            block = data[i:i+16]
-            if self._is_potential_encrypted_block(block):
-                blocks['suspected_encryption'] = True
-                blocks['patterns'].append({
-                    'offset': i,
-                    'type': 'encrypted_block',
-                    'entropy': self._calculate_entropy(block)
-                })
+        import numpy as np
+        from .entropy import block_entropy
+        
+        entropies = block_entropy(data, 16, len(range(0, len(data) - 16, 16)))
+        for index in np.flatnonzero(entropies > self.HIGH_ENTROPY):
+            blocks['suspected_encryption'] = True
+            blocks['patterns'].append({
+                'offset': 16 * int(index),
+                'type': 'encrypted_block',
+                'entropy': float(entropies[index])
+            })
                 
         return blocks
         
     def _calculate_entropy(self, data: bytes) -> float:
         """Calculate entropy of a data block"""
-        if not data:
-            return 0.0
-            
-        counts = {}
-        for byte in data:
-            counts[byte] = counts.get(byte, 0) + 1
-            
-        length = len(data)
-        probabilities = [count / length for count in counts.values()]
-        return -sum(p * (p.bit_length() - 1) for p in probabilities)
+        from .entropy import entropy
+        return entropy(data)
         
     def _check_repeating_patterns(self, data: bytes) -> bool:
         """Check for repeating patterns"""
@@ -156,33 +244,29 @@ class PupAnalyzer:
     def _is_potential_key_block(self, block: bytes) -> bool:
         """Check if a block could be a key"""
         # A key block typically has high entropy
-        entropy = self._calculate_entropy(block)
-        return entropy > 7.0
+        return self._calculate_entropy(block) > self.HIGH_ENTROPY
         
     def _is_potential_key(self, block: bytes) -> bool:
         """Check if a block could be an encryption key"""
         # A key typically has specific characteristics
-        entropy = self._calculate_entropy(block)
         unique_bytes = len(set(block))
         
         return (
-            entropy > 7.0 and  # High entropy
+            self._calculate_entropy(block) > self.HIGH_ENTROPY and  # High entropy
             unique_bytes > 12 and  # Almost all bytes are different
             not all(b == 0 for b in block)  # Not all zero
         )
         
     def _calculate_key_confidence(self, block: bytes) -> float:
         """Calculate the confidence that a block is a key"""
-        entropy = self._calculate_entropy(block)
         unique_bytes = len(set(block))
         
         # Score based on entropy and uniqueness of bytes
-        entropy_score = min(1.0, entropy / 8.0)
+        entropy_score = min(1.0, self._calculate_entropy(block) / 8.0)
         uniqueness_score = min(1.0, unique_bytes / 16.0)
         
         return (entropy_score + uniqueness_score) / 2.0
         
     def _is_potential_encrypted_block(self, block: bytes) -> bool:
         """Check if a block could be encrypted"""
-        entropy = self._calculate_entropy(block)
-        return entropy > 7.0 
\ No newline at end of file
+        return self._calculate_entropy(block) > self.HIGH_ENTROPY
\ No newline at end of file
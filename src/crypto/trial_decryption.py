@@ -0,0 +1,68 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from .entropy import block_entropy
+
+AES_BLOCK_SIZE = 16
+
+def candidate_ivs(count: int = 16) -> List[bytes]:
+    """IVs tried with each suspected key: 00..00, 01..01, ..."""
+    return [bytes([i] * AES_BLOCK_SIZE) for i in range(count)]
+
+def likely_decrypted(plaintexts: np.ndarray) -> np.ndarray:
+    """PupDecryption._is_likely_decrypted for every row of an (N, length) uint8 array at once"""
+    rows, length = plaintexts.shape
+    if length < 16:
+        return np.zeros(rows, dtype=bool)
+
+    # Normal data: entropy between 4.0 and 7.0, not too many null bytes, enough printable ASCII
+    entropies = block_entropy(plaintexts, length)
+    nulls = np.count_nonzero(plaintexts == 0, axis=1)
+    printable = np.count_nonzero((plaintexts >= 32) & (plaintexts <= 126), axis=1)
+    return (entropies >= 4.0) & (entropies <= 7.0) & (nulls <= length / 2) & (printable >= length / 4)
+
+def trial_decrypt(ciphertext: bytes, keys: Sequence[bytes], ivs: Sequence[bytes]) -> Dict[str, np.ndarray]:
+    """
+    AES-CBC decryption of ciphertext with every (key, IV) pair, scored together.
+
+    In CBC only the first plaintext block depends on the IV (P1 = D(C1) ^ IV,
+    Pn = D(Cn) ^ Cn-1), so each key decrypts the ciphertext once in ECB mode
+    and all the IVs are applied with one XOR. Returns arrays indexed by
+    [key, iv]: plaintexts (keys, IVs, length), valid (False where AES would
+    reject the key, the IV or the ciphertext length) and likely (valid and
+    passing likely_decrypted).
+    """
+    from Crypto.Cipher import AES
+
+    length = len(ciphertext)
+    plaintexts = np.zeros((len(keys), len(ivs), length), dtype=np.uint8)
+    valid = np.zeros((len(keys), len(ivs)), dtype=bool)
+
+    iv_valid = np.array([len(iv) == AES_BLOCK_SIZE for iv in ivs], dtype=bool)
+    iv_array = np.zeros((len(ivs), AES_BLOCK_SIZE), dtype=np.uint8)
+    for i, iv in enumerate(ivs):
+        if iv_valid[i]:
+            iv_array[i] = np.frombuffer(iv, dtype=np.uint8)
+
+    if length and length % AES_BLOCK_SIZE == 0:
+        ciphertext = bytes(ciphertext)
+        previous = np.frombuffer(ciphertext, dtype=np.uint8)[:-AES_BLOCK_SIZE]
+        for k, key in enumerate(keys):
+            try:
+                decrypted = np.frombuffer(AES.new(bytes(key), AES.MODE_ECB).decrypt(ciphertext), dtype=np.uint8)
+            except ValueError:
+                # Invalid key size
+                continue
+            plaintexts[k, :, :AES_BLOCK_SIZE] = decrypted[:AES_BLOCK_SIZE] ^ iv_array
+            plaintexts[k, :, AES_BLOCK_SIZE:] = decrypted[AES_BLOCK_SIZE:] ^ previous
+            valid[k] = iv_valid
+
+    likely = likely_decrypted(plaintexts.reshape(len(keys) * len(ivs), length)).reshape(valid.shape) & valid
+    return {'plaintexts': plaintexts, 'valid': valid, 'likely': likely}
+
+def first_likely(likely: np.ndarray) -> Optional[Tuple[int, int]]:
+    """(key, iv) indices of the first likely decryption in key then IV order, None if there is none"""
+    found = np.flatnonzero(likely)
+    if len(found) == 0:
+        return None
+    key_index, iv_index = divmod(int(found[0]), likely.shape[1])
+    return key_index, iv_index
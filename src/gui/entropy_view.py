@@ -0,0 +1,99 @@
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QPainter
+from PyQt6.QtWidgets import QHBoxLayout, QLabel, QPushButton, QVBoxLayout, QWidget
+
+# Highest entropy of a byte stream, in bits per byte
+MAX_ENTROPY = 8.0
+
+class EntropyMapView(QWidget):
+    """
+    Entropy of a whole file as one bar per pixel column, drawn from an
+    EntropyProfile: the values come from its precomputed levels, so even a
+    multi-GB image is drawn at once and redrawn on every resize.
+    """
+
+    # Byte offset of the clicked column (object: can exceed 32 bits)
+    offset_clicked = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.profile = None
+        self.threshold = 7.0
+        self.setMinimumHeight(120)
+        self.setMouseTracking(True)
+
+    def set_profile(self, profile) -> None:
+        self.profile = profile
+        self.update()
+
+    def _offset_at(self, x: int) -> int:
+        return min(self.profile.size - 1, max(0, int(x * self.profile.size / max(1, self.width()))))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.palette().base())
+        if self.profile is None or self.profile.size == 0:
+            painter.setPen(self.palette().text().color())
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "No entropy profile")
+            return
+
+        width, height = self.width(), self.height()
+        _, values = self.profile.map(width)
+        column_width = width / len(values)
+        for column, value in enumerate(values):
+            value = float(value)
+            # Blue for low entropy, red for compressed or encrypted data
+            level = min(1.0, value / MAX_ENTROPY)
+            color = QColor.fromHsvF(0.66 * (1.0 - level), 0.8, 0.9)
+            bar = int(height * level)
+            painter.fillRect(int(column * column_width), height - bar, max(1, int(column_width + 0.5)), bar, color)
+
+        # Threshold line
+        painter.setPen(self.palette().text().color())
+        y = height - int(height * self.threshold / MAX_ENTROPY)
+        painter.drawLine(0, y, width, y)
+
+    def mouseMoveEvent(self, event):
+        if self.profile is not None and self.profile.size:
+            offset = self._offset_at(int(event.position().x()))
+            self.setToolTip(f"0x{offset:X}: {self.profile.range_entropy(offset, offset + 0x1000):.3f} bits/byte")
+
+    def mousePressEvent(self, event):
+        if self.profile is not None and self.profile.size and event.button() == Qt.MouseButton.LeftButton:
+            self.offset_clicked.emit(self._offset_at(int(event.position().x())))
+
+class EntropyTab(QWidget):
+    """Entropy map of the loaded file, computed on request and cached next to the file"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.status_label = QLabel("No entropy profile")
+        controls.addWidget(self.status_label)
+        controls.addStretch()
+        self.compute_button = QPushButton("Compute Entropy Map")
+        controls.addWidget(self.compute_button)
+        layout.addLayout(controls)
+
+        self.map_view = EntropyMapView()
+        layout.addWidget(self.map_view)
+
+        self.ranges_label = QLabel()
+        self.ranges_label.setWordWrap(True)
+        layout.addWidget(self.ranges_label)
+
+    def set_profile(self, profile, description: str = "") -> None:
+        self.map_view.set_profile(profile)
+        if profile is None:
+            self.status_label.setText("No entropy profile")
+            self.ranges_label.clear()
+            return
+
+        ranges = profile.ranges_above(self.map_view.threshold, 0x10000)
+        self.status_label.setText(
+            f"{description}: {profile.range_entropy(0, profile.size):.3f} bits/byte overall")
+        self.ranges_label.setText(
+            f"{len(ranges)} regions above {self.map_view.threshold:.1f} bits/byte (64KB blocks), "
+            f"{sum(end - start for start, end in ranges) / 0x100000:.1f} MB. Click the map to open an offset.")
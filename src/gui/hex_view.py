@@ -0,0 +1,255 @@
+from typing import Optional
+from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtGui import QColor, QFontDatabase, QPainter
+from PyQt6.QtWidgets import (QAbstractScrollArea, QComboBox, QHBoxLayout, QLabel, QLineEdit,
+                             QPushButton, QVBoxLayout, QWidget)
+
+# Printable ASCII is shown as is, everything else as '.'
+ASCII_TABLE = bytes(b if 0x20 <= b < 0x7F else ord('.') for b in range(256))
+
+class HexView(QAbstractScrollArea):
+    """
+    Hex/ASCII view of a byte buffer (bytes, memoryview of a mapping...).
+
+    Only the rows visible in the viewport are read and drawn, so the size of
+    the buffer does not matter: a memory-mapped file is paged in as it is
+    scrolled. Addresses are shown as base_offset + position.
+    """
+
+    BYTES_PER_ROW = 16
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.data = None
+        self.base_offset = 0
+        self.highlight: Optional[tuple] = None  # (position, length)
+        self.verticalScrollBar().valueChanged.connect(self.viewport().update)
+
+    def set_data(self, data, base_offset: int = 0) -> None:
+        self.data = data
+        self.base_offset = base_offset
+        self.highlight = None
+        self._update_scrollbar()
+        self.verticalScrollBar().setValue(0)
+        self.viewport().update()
+
+    def clear(self) -> None:
+        self.set_data(None)
+
+    def _row_height(self) -> int:
+        return self.fontMetrics().height()
+
+    def _visible_rows(self) -> int:
+        return max(1, self.viewport().height() // self._row_height())
+
+    def _update_scrollbar(self) -> None:
+        rows = -(-len(self.data) // self.BYTES_PER_ROW) if self.data is not None else 0
+        visible = self._visible_rows()
+        scrollbar = self.verticalScrollBar()
+        scrollbar.setRange(0, max(0, rows - visible))
+        scrollbar.setPageStep(visible)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbar()
+
+    def go_to(self, position: int, length: int = 0) -> None:
+        """Scroll to a position of the buffer and highlight length bytes from it"""
+        self.highlight = (position, length) if length else None
+        row = position // self.BYTES_PER_ROW
+        self.verticalScrollBar().setValue(max(0, row - self._visible_rows() // 3))
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), self.palette().base())
+        if self.data is None:
+            return
+
+        metrics = self.fontMetrics()
+        char_width = metrics.horizontalAdvance('0')
+        row_height = self._row_height()
+        # Columns: 10 digits of address, 2 spaces, 3 characters per byte, 1 space, ASCII
+        hex_x = 12 * char_width
+        ascii_x = hex_x + (self.BYTES_PER_ROW * 3 + 1) * char_width
+
+        first_row = self.verticalScrollBar().value()
+        start = first_row * self.BYTES_PER_ROW
+        # Only the visible rows are read from the buffer
+        rows = bytes(self.data[start:start + (self._visible_rows() + 1) * self.BYTES_PER_ROW])
+
+        if self.highlight:
+            color = self.palette().highlight().color()
+            position, length = self.highlight
+            for i in range(max(position, start), min(position + length, start + len(rows))):
+                row, column = divmod(i - start, self.BYTES_PER_ROW)
+                y = row * row_height
+                painter.fillRect(hex_x + column * 3 * char_width, y, 2 * char_width, row_height, color)
+                painter.fillRect(ascii_x + column * char_width, y, char_width, row_height, color)
+
+        painter.setPen(self.palette().text().color())
+        address_color = QColor(self.palette().text().color())
+        address_color.setAlpha(140)
+        for row in range(0, len(rows), self.BYTES_PER_ROW):
+            data = rows[row:row + self.BYTES_PER_ROW]
+            y = (row // self.BYTES_PER_ROW) * row_height + metrics.ascent()
+            painter.setPen(address_color)
+            painter.drawText(0, y, f"{self.base_offset + start + row:010X}")
+            painter.setPen(self.palette().text().color())
+            painter.drawText(hex_x, y, data.hex(' ').upper())
+            painter.drawText(ascii_x, y, data.translate(ASCII_TABLE).decode('ascii'))
+
+class SearchWorker(QThread):
+    """Search a pattern in a buffer from a position, chunk by chunk, off the GUI thread"""
+
+    # Position of the first match, -1 if there is none (object: can exceed 32 bits)
+    found = pyqtSignal(object)
+
+    CHUNK_SIZE = 0x400000  # 4MB
+
+    def __init__(self, data, pattern: bytes, start: int = 0):
+        super().__init__()
+        self.data = data
+        self.pattern = pattern
+        self.start_position = start
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        size = len(self.data)
+        overlap = len(self.pattern) - 1
+        position = self.start_position
+        while position < size and not self._cancelled:
+            # Chunks overlap so that a match across two chunks is found
+            chunk = bytes(self.data[position:position + self.CHUNK_SIZE + overlap])
+            index = chunk.find(self.pattern)
+            if index != -1:
+                self.found.emit(position + index)
+                return
+            position += self.CHUNK_SIZE
+        self.found.emit(-1)
+
+class HexViewerTab(QWidget):
+    """Hex view with jump-to-offset and background pattern search"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.search_worker = None
+        self.match = None  # (position, length) of the last match
+        self.pattern_length = 0
+
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.source_label = QLabel("No data")
+        controls.addWidget(self.source_label)
+        controls.addStretch()
+
+        controls.addWidget(QLabel("Go to:"))
+        self.offset_edit = QLineEdit()
+        self.offset_edit.setPlaceholderText("0x0")
+        self.offset_edit.setMaximumWidth(140)
+        self.offset_edit.returnPressed.connect(self.go_to_offset)
+        controls.addWidget(self.offset_edit)
+
+        controls.addWidget(QLabel("Search:"))
+        self.search_mode = QComboBox()
+        self.search_mode.addItems(["Hex", "Text"])
+        controls.addWidget(self.search_mode)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("4F 15 3D 1D")
+        self.search_edit.returnPressed.connect(self.find_next)
+        controls.addWidget(self.search_edit)
+        self.find_button = QPushButton("Find Next")
+        self.find_button.clicked.connect(self.find_next)
+        controls.addWidget(self.find_button)
+        layout.addLayout(controls)
+
+        self.hex_view = HexView()
+        layout.addWidget(self.hex_view)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+    def show_data(self, data, base_offset: int = 0, description: str = "") -> None:
+        """Show a buffer; base_offset is the address of its first byte"""
+        self.stop_search()
+        self.match = None
+        self.hex_view.set_data(data, base_offset)
+        self.source_label.setText(f"{description} ({len(data)} bytes)")
+        self.status_label.clear()
+
+    def clear(self) -> None:
+        """Drop the buffer (e.g. before the file it maps is closed)"""
+        self.stop_search()
+        self.match = None
+        self.hex_view.clear()
+        self.source_label.setText("No data")
+        self.status_label.clear()
+
+    def go_to_offset(self):
+        if self.hex_view.data is None:
+            return
+        try:
+            address = int(self.offset_edit.text().strip(), 0)
+        except ValueError:
+            self.status_label.setText("Invalid offset, use decimal or 0x hex")
+            return
+
+        position = address - self.hex_view.base_offset
+        if not 0 <= position < len(self.hex_view.data):
+            self.status_label.setText(f"Offset 0x{address:X} out of range")
+            return
+        self.hex_view.go_to(position, 1)
+        self.status_label.setText(f"Offset 0x{address:X}")
+
+    def search_pattern(self) -> Optional[bytes]:
+        text = self.search_edit.text()
+        if self.search_mode.currentText() == "Text":
+            return text.encode('utf-8') or None
+        try:
+            return bytes.fromhex(text.replace(' ', '')) or None
+        except ValueError:
+            return None
+
+    def find_next(self):
+        if self.hex_view.data is None or self.search_worker:
+            return
+        pattern = self.search_pattern()
+        if not pattern:
+            self.status_label.setText("Invalid search pattern")
+            return
+
+        # Continue after the last match
+        start = self.match[0] + 1 if self.match else 0
+        self.pattern_length = len(pattern)
+        self.search_worker = SearchWorker(self.hex_view.data, pattern, start)
+        self.search_worker.found.connect(self.on_search_finished)
+        self.find_button.setEnabled(False)
+        self.status_label.setText("Searching...")
+        self.search_worker.start()
+
+    def on_search_finished(self, position):
+        self.search_worker.wait()
+        self.search_worker = None
+        self.find_button.setEnabled(True)
+
+        if position < 0:
+            self.match = None
+            self.status_label.setText("Pattern not found (the next search starts from the beginning)")
+            return
+
+        self.match = (position, self.pattern_length)
+        self.hex_view.go_to(position, self.pattern_length)
+        self.status_label.setText(f"Found at 0x{self.hex_view.base_offset + position:X}")
+
+    def stop_search(self):
+        if self.search_worker:
+            self.search_worker.cancel()
+            self.search_worker.found.disconnect()
+            self.search_worker.wait()
+            self.search_worker = None
+            self.find_button.setEnabled(True)
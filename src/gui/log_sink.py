@@ -0,0 +1,106 @@
+import logging
+import queue
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtWidgets import QPlainTextEdit
+
+# Lines kept by the log view, the oldest are dropped first
+DEFAULT_MAX_LINES = 10000
+# Interval between two updates of the log view
+DEFAULT_FLUSH_INTERVAL_MS = 100
+# Lines added to the view at each update, the rest are summarized
+DEFAULT_MAX_LINES_PER_FLUSH = 1000
+
+LEVELS = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR
+}
+
+def message_level(message: str) -> int:
+    """Guess the level of a message printed by the core modules"""
+    text = message.lstrip()
+    if text.startswith('Error') or text.startswith('Traceback'):
+        return logging.ERROR
+    if text.startswith('Warning') or text.startswith('Attention'):
+        return logging.WARNING
+    # Per-candidate details of the structure analysis
+    if text.startswith('Possible ') or message.startswith('  '):
+        return logging.DEBUG
+    return logging.INFO
+
+class LogSink(QObject):
+    """
+    Thread-safe, batched log for a QPlainTextEdit.
+
+    write() only puts the message in a queue, from any thread. A timer on
+    the GUI thread moves the queued lines to the view in a single append,
+    and the view keeps at most max_lines lines. Messages below min_level
+    are dropped as they are written.
+    """
+
+    def __init__(self, view: QPlainTextEdit, max_lines: int = DEFAULT_MAX_LINES,
+                 flush_interval_ms: int = DEFAULT_FLUSH_INTERVAL_MS,
+                 max_lines_per_flush: int = DEFAULT_MAX_LINES_PER_FLUSH):
+        super().__init__(view)
+        self.view = view
+        self.view.setMaximumBlockCount(max_lines)
+        self.min_level = logging.INFO
+        self.max_lines_per_flush = max_lines_per_flush
+        self._queue = queue.SimpleQueue()
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start(flush_interval_ms)
+
+    def set_level(self, level) -> None:
+        """Set the minimum level shown, as a logging level or its name"""
+        self.min_level = LEVELS.get(level, level) if isinstance(level, str) else level
+
+    def write(self, message, level: int = None) -> None:
+        """Queue a message, can be called from any thread"""
+        if not isinstance(message, str) or not message.strip():
+            return
+
+        message = message.rstrip('\n')
+        if level is None:
+            level = message_level(message)
+        if level < self.min_level:
+            return
+
+        self._queue.put(message)
+
+    def write_error(self, message) -> None:
+        """write() for stderr"""
+        self.write(message, logging.ERROR)
+
+    def flush(self) -> None:
+        """Move the queued messages to the view, on the GUI thread"""
+        lines = []
+        dropped = 0
+        while True:
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if len(lines) < self.max_lines_per_flush:
+                lines.append(message)
+            else:
+                dropped += 1
+
+        if not lines:
+            return
+        if dropped:
+            lines.append(f"... {dropped} more messages not shown")
+
+        self.view.appendPlainText("\n".join(lines))
+        self.view.ensureCursorVisible()
+
+    def clear(self) -> None:
+        """Drop the queued messages and empty the view"""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self.view.clear()
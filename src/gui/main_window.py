@@ -1,12 +1,19 @@
 import os
 import sys
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                            QPushButton, QTreeWidget, QTreeWidgetItem, QFileDialog, 
+                            QPushButton, QTableView, QAbstractItemView, QHeaderView, QLineEdit, QFileDialog, 
                             QMessageBox, QLabel, QGroupBox, QFormLayout, QTabWidget,
-                            QComboBox, QCheckBox, QTextEdit, QApplication)
+                            QComboBox, QPlainTextEdit, QProgressBar)
 from PyQt6.QtCore import Qt, QSize
+from core.mapped_file import MappedFile
 from core.pup_file import Pup
+from core.scan_index import ScanIndex
 from core.slb2_file import SLB2File
+from gui.entropy_view import EntropyTab
+from gui.hex_view import HexViewerTab
+from gui.log_sink import LEVELS, LogSink
+from gui.table_models import EntryTableModel, SegmentTableModel, TableFilterProxyModel
+from gui.workers import OperationWorker
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -17,13 +24,23 @@ class MainWindow(QMainWindow):
         self.pup = None
         self.slb2 = None
         self.file_type = None
+        self.scan_index = ScanIndex()
+        # Mapping of the SLB2 file shown in the hex viewer
+        self.slb2_source = None
+        # Entropy profile of the loaded file (Entropy tab)
+        self.entropy_profile = None
+        
+        # Operazione in corso in background (caricamento o estrazione)
+        self.worker = None
+        self.operation_description = None
+        self.on_operation_done = None
         
         # Creazione dell'interfaccia
         self.create_widgets()
         
         # Redirect stdout e stderr alla text area
-        sys.stdout.write = self.log
-        sys.stderr.write = self.log
+        sys.stdout.write = self.log_sink.write
+        sys.stderr.write = self.log_sink.write_error
         
     def create_widgets(self):
         # Widget centrale
@@ -56,12 +73,34 @@ class MainWindow(QMainWindow):
         self.clear_log_button.clicked.connect(self.clear_log)
         control_layout.addWidget(self.clear_log_button)
         
+        # Livello minimo dei messaggi mostrati
+        self.log_level_combo = QComboBox()
+        self.log_level_combo.addItems(list(LEVELS))
+        self.log_level_combo.setCurrentText("INFO")
+        self.log_level_combo.currentTextChanged.connect(self.set_log_level)
+        control_layout.addWidget(QLabel("Log level:"))
+        control_layout.addWidget(self.log_level_combo)
+        
         main_layout.addLayout(control_layout)
         
+        # Avanzamento dell'operazione in corso
+        progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)  # Per mille: the sizes can exceed 32 bits
+        progress_layout.addWidget(self.progress_bar)
+        self.progress_label = QLabel()
+        progress_layout.addWidget(self.progress_label)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_operation)
+        progress_layout.addWidget(self.cancel_button)
+        main_layout.addLayout(progress_layout)
+        
         # Area log
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
         self.log_text.setMinimumHeight(200)
+        self.log_sink = LogSink(self.log_text)
         main_layout.addWidget(self.log_text)
         
         # TabWidget for different views
@@ -93,11 +132,13 @@ class MainWindow(QMainWindow):
         self.segments_tab = QWidget()
         segments_layout = QVBoxLayout(self.segments_tab)
         
-        # Tree widget for displaying segments
-        self.segments_tree = QTreeWidget()
-        self.segments_tree.setHeaderLabels(["Name", "Size", "Original Size", "Offset", "Flags"])
-        self.segments_tree.setSelectionMode(QTreeWidget.SelectionMode.ExtendedSelection)
-        segments_layout.addWidget(self.segments_tree)
+        # Table for displaying segments, filled lazily by the model
+        self.segments_model = SegmentTableModel(self)
+        self.segments_proxy = TableFilterProxyModel(self.segments_model, self)
+        self.segments_filter = self.create_filter_edit(self.segments_proxy)
+        segments_layout.addWidget(self.segments_filter)
+        self.segments_view = self.create_table_view(self.segments_proxy)
+        segments_layout.addWidget(self.segments_view)
         
         self.tabs.addTab(self.segments_tab, "Segmenti PUP")
         
@@ -105,26 +146,215 @@ class MainWindow(QMainWindow):
         self.entries_tab = QWidget()
         entries_layout = QVBoxLayout(self.entries_tab)
         
-        # Tree widget for displaying entries
-        self.entries_tree = QTreeWidget()
-        self.entries_tree.setHeaderLabels(["Name", "Size", "Start Sector", "Offset"])
-        self.entries_tree.setSelectionMode(QTreeWidget.SelectionMode.ExtendedSelection)
-        entries_layout.addWidget(self.entries_tree)
+        # Table for displaying entries
+        self.entries_model = EntryTableModel(self)
+        self.entries_proxy = TableFilterProxyModel(self.entries_model, self)
+        self.entries_filter = self.create_filter_edit(self.entries_proxy)
+        entries_layout.addWidget(self.entries_filter)
+        self.entries_view = self.create_table_view(self.entries_proxy)
+        entries_layout.addWidget(self.entries_view)
         
         self.tabs.addTab(self.entries_tab, "Entry SLB2")
         
+        # Tab for the hex viewer (double click on a segment or an entry)
+        self.hex_tab = HexViewerTab()
+        self.tabs.addTab(self.hex_tab, "Hex Viewer")
+        self.segments_view.doubleClicked.connect(self.view_segment)
+        self.entries_view.doubleClicked.connect(self.view_entry)
+        
+        # Tab for the entropy map of the whole file
+        self.entropy_tab = EntropyTab()
+        self.entropy_tab.compute_button.clicked.connect(self.compute_entropy)
+        self.entropy_tab.map_view.offset_clicked.connect(self.view_file_offset)
+        self.tabs.addTab(self.entropy_tab, "Entropy")
+        
         main_layout.addWidget(self.tabs)
         
+    def create_table_view(self, model):
+        view = QTableView()
+        view.setModel(model)
+        view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        view.setSortingEnabled(True)
+        view.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        view.verticalHeader().setVisible(False)
+        # Fixed row height: the view does not measure the rows
+        view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        view.horizontalHeader().setStretchLastSection(True)
+        return view
+        
+    def create_filter_edit(self, proxy):
+        edit = QLineEdit()
+        edit.setPlaceholderText("Filter...")
+        edit.setClearButtonEnabled(True)
+        edit.textChanged.connect(proxy.set_filter_text)
+        return edit
+        
+    def selected_indices(self, view, proxy):
+        """Table indices of the rows selected in a view"""
+        return sorted(proxy.table_indices(view.selectionModel().selectedRows()))
+        
     def log(self, message):
-        if not isinstance(message, str):
+        # Queued, the view is updated in batches by the log sink
+        self.log_sink.write(message)
+        
+    def clear_log(self):
+        self.log_sink.clear()
+        
+    def set_log_level(self, level):
+        self.log_sink.set_level(level)
+        
+    def start_operation(self, description, function, *args, on_finished=None, **kwargs):
+        """Run function on a worker thread, then on_finished(result) on the GUI thread"""
+        self.operation_description = description
+        self.on_operation_done = on_finished
+        self.worker = OperationWorker(function, *args, **kwargs)
+        self.worker.progress.connect(self.on_operation_progress)
+        self.worker.result_ready.connect(self.on_operation_finished)
+        
+        self.set_busy(True)
+        self.progress_bar.setValue(0)
+        self.progress_label.setText(f"{description}...")
+        self.worker.start()
+        
+    def on_operation_progress(self, done, total, rate):
+        self.progress_bar.setValue(int(done * 1000 / total) if total else 0)
+        self.progress_label.setText(
+            f"{self.operation_description}: {done / 0x100000:.1f} / {total / 0x100000:.1f} MB "
+            f"({rate / 0x100000:.1f} MB/s)")
+        
+    def on_operation_finished(self, result):
+        worker = self.worker
+        worker.wait()
+        self.worker = None
+        self.set_busy(False)
+        
+        if worker.cancelled:
+            self.log(f"{self.operation_description} cancelled")
+            self.progress_label.setText(f"{self.operation_description}: cancelled")
+            return
+            
+        self.progress_bar.setValue(1000)
+        self.progress_label.setText(f"{self.operation_description}: completed")
+        if self.on_operation_done:
+            self.on_operation_done(result)
+            
+    def cancel_operation(self):
+        if self.worker:
+            self.log(f"Cancelling: {self.operation_description}")
+            self.worker.cancel()
+            
+    def set_busy(self, busy):
+        self.select_button.setEnabled(not busy)
+        self.extract_button.setEnabled(not busy)
+        self.cancel_button.setEnabled(busy)
+        # No double-click or new selection on the tables while the worker runs
+        self.segments_view.setEnabled(not busy)
+        self.entries_view.setEnabled(not busy)
+        
+    def closeEvent(self, event):
+        # Stop the operation in progress before the window goes away
+        if self.worker:
+            self.worker.cancel()
+            self.worker.wait()
+        self.release_hex_sources()
+        super().closeEvent(event)
+        
+    def release_hex_sources(self):
+        """Drop the tables and the views shown in the hex viewer before their files are closed"""
+        self.segments_model.set_table(None)
+        self.entries_model.set_table(None)
+        self.hex_tab.clear()
+        self.entropy_tab.set_profile(None)
+        if self.entropy_profile:
+            self.entropy_profile.close()
+            self.entropy_profile = None
+        if self.slb2_source:
+            self.slb2_source.close()
+            self.slb2_source = None
+            
+    def loaded_file_path(self):
+        if self.pup and self.pup.file_data:
+            return self.pup.file_path
+        if self.slb2 and self.slb2.header_data:
+            return self.slb2.file_path
+        return None
+        
+    def compute_entropy(self):
+        file_path = self.loaded_file_path()
+        if not file_path or self.worker:
+            return
+        # NumPy is only loaded when an entropy map is asked for
+        from crypto.entropy_profile import EntropyProfile
+        self.start_operation("Computing entropy profile", EntropyProfile.for_file, file_path,
+                             on_finished=self.on_entropy_computed)
+        
+    def on_entropy_computed(self, profile):
+        if profile is None:
+            self.log("Unable to compute the entropy profile")
             return
+        if self.entropy_profile:
+            self.entropy_profile.close()
+        self.entropy_profile = profile
+        self.entropy_tab.set_profile(profile, os.path.basename(self.loaded_file_path() or ""))
+        
+    def view_file_offset(self, offset):
+        """Show the whole loaded file in the hex viewer at offset (click on the entropy map)"""
+        if self.pup and self.pup.file_data:
+            data = self.pup.file_data
+            description = os.path.basename(self.pup.file_path)
+        elif self.slb2:
+            if not self.slb2_source:
+                self.slb2_source = MappedFile(self.slb2.file_path)
+                self.slb2_source.open()
+            data = self.slb2_source.data
+            description = os.path.basename(self.slb2.file_path)
+        else:
+            return
+        if self.hex_tab.hex_view.data is not data or self.hex_tab.hex_view.base_offset != 0:
+            self.hex_tab.show_data(data, 0, description)
+        self.hex_tab.hex_view.go_to(offset, 1)
+        self.tabs.setCurrentWidget(self.hex_tab)
+            
+    def view_segment(self, proxy_index):
+        if not self.pup or not self.pup.file_data:
+            return
+        index = self.segments_proxy.table_indices([proxy_index])[0]
+        segment = self.pup.segment_table[index]
+        
+        if segment['is_compressed'] and not segment['is_encrypted']:
+            if self.worker:
+                return
+            # Decompressed once on a worker, then kept in the segment cache
+            self.start_operation(f"Decompressing segment {index}", self.pup.get_segment_data, index,
+                                 on_finished=lambda data: self.on_segment_decompressed(index, data))
+            return
+            
+        # View of the mapped file, pages are read as they are shown
+        offset = segment['offset']
+        data = self.pup.file_data[offset:offset + segment['compressed_size']]
+        self.hex_tab.show_data(data, offset, f"Segment {index}")
+        self.tabs.setCurrentWidget(self.hex_tab)
+        
+    def on_segment_decompressed(self, index, data):
+        if data is None:
+            QMessageBox.critical(self, "Error", f"Impossible to decompress the segment {index}")
+            return
+        self.hex_tab.show_data(data, 0, f"Segment {index} (decompressed)")
+        self.tabs.setCurrentWidget(self.hex_tab)
         
-        self.log_text.append(message)
-        self.log_text.ensureCursorVisible()
-        QApplication.processEvents()  # Force interface update
+    def view_entry(self, proxy_index):
+        if not self.slb2:
+            return
+        index = self.entries_proxy.table_indices([proxy_index])[0]
+        entry = self.slb2.entries[index]
         
-    def clear_log(self):
-        self.log_text.clear()
+        if not self.slb2_source:
+            self.slb2_source = MappedFile(self.slb2.file_path)
+            self.slb2_source.open()
+        data = self.slb2_source.view(entry['offset'], entry['offset'] + entry['size'])
+        self.hex_tab.show_data(data, entry['offset'], entry['name'])
+        self.tabs.setCurrentWidget(self.hex_tab)
         
     def select_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
@@ -164,14 +394,20 @@ class MainWindow(QMainWindow):
             self.load_slb2_file(file_path)
             
     def load_pup_file(self, file_path):
-        self.pup = Pup(file_path)
+        self.release_hex_sources()
+        if self.pup:
+            self.pup.close()
+        self.pup = Pup(file_path, scan_index=self.scan_index)
         self.slb2 = None
         
         self.log(f"Loading PUP file: {file_path}")
-
-        if self.pup.load():
+        self.start_operation("Loading PUP file", self.pup.load, on_finished=self.on_pup_loaded)
+        
+    def on_pup_loaded(self, success):
+        if success:
             self.update_pup_info()
-            self.update_segments_tree()
+            self.hex_tab.show_data(self.pup.file_data, 0, os.path.basename(self.pup.file_path))
+            self.update_segments_table()
             self.tabs.setCurrentIndex(0)  # Go to information tab
             self.log("PUP file loaded correctly")
             QMessageBox.information(self, "Success", "PUP file loaded correctly")
@@ -180,14 +416,19 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Error", "Unable to load PUP file")
             
     def load_slb2_file(self, file_path):
+        self.release_hex_sources()
         self.slb2 = SLB2File(file_path)
+        if self.pup:
+            self.pup.close()
         self.pup = None
         
         self.log(f"Loading SLB2 file: {file_path}")
+        self.start_operation("Loading SLB2 file", self.slb2.load, on_finished=self.on_slb2_loaded)
         
-        if self.slb2.load():
+    def on_slb2_loaded(self, success):
+        if success:
             self.update_slb2_info()
-            self.update_entries_tree()
+            self.update_entries_table()
             self.tabs.setCurrentIndex(0)  # Go to information tab
             self.log("SLB2 file loaded correctly")
             QMessageBox.information(self, "Success", "SLB2 file loaded correctly")
@@ -226,39 +467,9 @@ class MainWindow(QMainWindow):
             self.type_label.setText("Unknown")
             self.fw_label.setText("Unknown")
                 
-    def update_segments_tree(self):
-        # Clear the tree widget
-        self.segments_tree.clear()
-        
-        if not self.pup:
-            return
-            
-        # Add segments to the tree widget
-        for i, segment in enumerate(self.pup.segment_table):
-            flags = []
-            if segment.get('is_info', False):
-                flags.append("INFO")
-            if segment.get('is_encrypted', False):
-                flags.append("ENCRYPTED")
-            if segment.get('is_signed', False):
-                flags.append("SIGNED")
-            if segment.get('is_compressed', False):
-                flags.append("COMPRESSED")
-            if segment.get('has_blocks', False):
-                flags.append("BLOCKS")
-            if segment.get('has_digests', False):
-                flags.append("DIGEST")
-            if segment.get('is_synthetic', False):
-                flags.append("SYNTHETIC")
-                
-            item = QTreeWidgetItem([
-                f"Segment {i}",
-                f"{segment.get('compressed_size', 0)} bytes",
-                f"{segment.get('uncompressed_size', 0)} bytes",
-                f"0x{segment.get('offset', 0):X}",
-                ", ".join(flags)
-            ])
-            self.segments_tree.addTopLevelItem(item)
+    def update_segments_table(self):
+        # The model reads the segment table directly, cells are formatted on demand
+        self.segments_model.set_table(self.pup.segment_table if self.pup else None)
             
     def update_slb2_info(self):
         if not self.slb2:
@@ -271,22 +482,8 @@ class MainWindow(QMainWindow):
         self.type_label.setText(f"Container (Flags: 0x{self.slb2.flags:08X})")
         self.fw_label.setText(f"Entries: {len(self.slb2.entries)}")
                 
-    def update_entries_tree(self):
-        # Clear the tree widget
-        self.entries_tree.clear()
-        
-        if not self.slb2:
-            return
-            
-        # Add entries to the tree widget
-        for i, entry in enumerate(self.slb2.entries):
-            item = QTreeWidgetItem([
-                entry['name'],
-                f"{entry['size']} bytes",
-                f"{entry['start_sector']} (0x{entry['start_sector']:X})",
-                f"0x{entry['offset']:X}"
-            ])
-            self.entries_tree.addTopLevelItem(item)
+    def update_entries_table(self):
+        self.entries_model.set_table(self.slb2.entries if self.slb2 else None)
             
     def extract_selected(self):
         if self.file_type == "PUP":
@@ -299,9 +496,18 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Error", "No PUP file loaded")
             return
             
-        selected_items = self.segments_tree.selectedItems()
-        if not selected_items:
-            QMessageBox.critical(self, "Error", "No segment selected")
+        selected_indices = self.selected_indices(self.segments_view, self.segments_proxy)
+        if not selected_indices:
+            # If no segment is selected, extract all segments
+            reply = QMessageBox.question(self, "Confirm", "No segment selected. Extract all segments?",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if reply == QMessageBox.StandardButton.Yes:
+                # Create output directory
+                output_dir = os.path.splitext(self.pup.file_path)[0]
+                self.log(f"Extraction of all segments in {output_dir}")
+                self.start_operation("Extracting segments", self.pup.extract_all, output_dir,
+                                     workers=os.cpu_count(),
+                                     on_finished=lambda files: self.on_all_segments_extracted(files, output_dir))
             return
             
         # Create output directory
@@ -309,8 +515,8 @@ class MainWindow(QMainWindow):
         os.makedirs(output_dir, exist_ok=True)
         
         # Extract selected segments
-        for item in selected_items:
-            index = self.segments_tree.indexOfTopLevelItem(item)
+        indices = []
+        for index in selected_indices:
             segment = self.pup.segment_table[index]
             
             # Check if the segment is encrypted or synthetic
@@ -326,21 +532,41 @@ class MainWindow(QMainWindow):
                 
             output_path = os.path.join(output_dir, f"segment_{index}.bin")
             self.log(f"Extraction segment {index} in {output_path}")
-            if self.pup.extract_segment(index, output_path):
-                self.log(f"Segment {index} extracted in {output_path}")
-            else:
-                self.log(f"Error: Impossible to extract the segment {index}")
-                QMessageBox.critical(self, "Error", f"Impossible to extract the segment {index}")
-                
-        QMessageBox.information(self, "Success", "Extraction completed")
+            indices.append(index)
+            
+        if not indices:
+            return
+            
+        self.start_operation("Extracting segments", self.pup.extract_all, output_dir,
+                             workers=os.cpu_count(), indices=indices,
+                             on_finished=lambda files: self.on_selection_extracted(
+                                 files, [os.path.join(output_dir, f"segment_{i}.bin") for i in indices], "segment"))
+        
+    def on_all_segments_extracted(self, extracted_files, output_dir):
+        if extracted_files:
+            self.log(f"Extracted {len(extracted_files)} segments in {output_dir}")
+            QMessageBox.information(self, "Success", f"Extracted {len(extracted_files)} segments in {output_dir}")
+        else:
+            self.log("Error: Impossible to extract the segments")
+            QMessageBox.critical(self, "Error", "Impossible to extract the segments")
+            
+    def on_selection_extracted(self, extracted_files, output_paths, kind):
+        failed = [path for path in output_paths if path not in (extracted_files or [])]
+        for path in failed:
+            self.log(f"Error: Impossible to extract the {kind} {os.path.basename(path)}")
+        if failed:
+            QMessageBox.critical(self, "Error", f"Impossible to extract {len(failed)} {kind}(s), "
+                                 f"{len(output_paths) - len(failed)} of {len(output_paths)} extracted")
+        else:
+            QMessageBox.information(self, "Success", "Extraction completed")
         
     def extract_slb2_entries(self):
         if not self.slb2:
             QMessageBox.critical(self, "Error", "No SLB2 file loaded")
             return
             
-        selected_items = self.entries_tree.selectedItems()
-        if not selected_items:
+        selected_indices = self.selected_indices(self.entries_view, self.entries_proxy)
+        if not selected_indices:
             # If no entry is selected, extract all entries
             reply = QMessageBox.question(self, "Confirm", "No entry selected. Extract all entries?",
                                          QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
@@ -348,14 +574,8 @@ class MainWindow(QMainWindow):
                 # Create output directory
                 output_dir = os.path.splitext(self.slb2.file_path)[0]
                 self.log(f"Extraction of all entries in {output_dir}")
-                extracted_files = self.slb2.extract_all(output_dir)
-                
-                if extracted_files:
-                    self.log(f"Extracted {len(extracted_files)} entries in {output_dir}")
-                    QMessageBox.information(self, "Success", f"Extracted {len(extracted_files)} entries in {output_dir}")
-                else:
-                    self.log("Error: Impossible to extract the entries")
-                    QMessageBox.critical(self, "Error", "Impossible to extract the entries")
+                self.start_operation("Extracting entries", self.slb2.extract_all, output_dir,
+                                     on_finished=lambda files: self.on_all_entries_extracted(files, output_dir))
             return
             
         # Create output directory
@@ -363,16 +583,24 @@ class MainWindow(QMainWindow):
         os.makedirs(output_dir, exist_ok=True)
         
         # Extract selected entries
-        for item in selected_items:
-            index = self.entries_tree.indexOfTopLevelItem(item)
+        indices = []
+        output_paths = []
+        names = self.slb2.output_names(selected_indices)
+        for index in selected_indices:
             entry = self.slb2.entries[index]
             
-            output_path = os.path.join(output_dir, entry['name'])
+            output_path = os.path.join(output_dir, names[index])
             self.log(f"Extraction entry {index} ({entry['name']}) in {output_path}")
-            if self.slb2.extract_entry(index, output_path):
-                self.log(f"Entry {index} extracted in {output_path}")
-            else:
-                self.log(f"Error: Impossible to extract the entry {index}")
-                QMessageBox.critical(self, "Error", f"Impossible to extract the entry {index}")
-                
-        QMessageBox.information(self, "Success", "Extraction completed") 
\ No newline at end of file
+            indices.append(index)
+            output_paths.append(output_path)
+            
+        self.start_operation("Extracting entries", self.slb2.extract_all, output_dir, indices=indices,
+                             on_finished=lambda files: self.on_selection_extracted(files, output_paths, "entry"))
+        
+    def on_all_entries_extracted(self, extracted_files, output_dir):
+        if extracted_files:
+            self.log(f"Extracted {len(extracted_files)} entries in {output_dir}")
+            QMessageBox.information(self, "Success", f"Extracted {len(extracted_files)} entries in {output_dir}")
+        else:
+            self.log("Error: Impossible to extract the entries")
+            QMessageBox.critical(self, "Error", "Impossible to extract the entries") 
\ No newline at end of file
@@ -0,0 +1,196 @@
+from typing import List, Optional
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+from core.tables import SEGMENT_FLAG_FIELDS
+
+# Role returning the raw value of a cell (numbers instead of formatted text)
+SORT_ROLE = Qt.ItemDataRole.UserRole
+
+# Labels of the segment flags, in display order
+FLAG_LABELS = {
+    'is_info': "INFO",
+    'is_encrypted': "ENCRYPTED",
+    'is_signed': "SIGNED",
+    'is_compressed': "COMPRESSED",
+    'has_blocks': "BLOCKS",
+    'has_digests': "DIGEST",
+    'is_synthetic': "SYNTHETIC"
+}
+
+class ColumnarTableModel(QAbstractTableModel):
+    """
+    Read-only model over a columnar table (SegmentTable, EntryTable).
+
+    Cells are formatted only when the view asks for them, so a table of any
+    size is shown at once. Sorting permutes a list of row numbers using the
+    table's own sorted_indices(), without comparing rows in Python.
+    """
+
+    # (header, sort key of the table or None for the table order)
+    COLUMNS = ()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.table = None
+        # View row -> table index, None while the table is in its own order
+        self._rows: Optional[List[int]] = None
+        self._sort_order = None
+
+    def set_table(self, table) -> None:
+        self.beginResetModel()
+        self.table = table
+        self._rows = None
+        if table is not None and self._sort_order:
+            # Keep the order chosen for the previous table
+            column, order = self._sort_order
+            self._rows = self.sorted_indices(column, order == Qt.SortOrder.DescendingOrder)
+        self.endResetModel()
+
+    def table_index(self, row: int) -> int:
+        """Index in the table of a row of the model"""
+        return self._rows[row] if self._rows is not None else row
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid() or self.table is None:
+            return 0
+        return len(self.table)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section][0]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or self.table is None:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.display(self.table_index(index.row()), index.column())
+        if role == SORT_ROLE:
+            return self.value(self.table_index(index.row()), index.column())
+        return None
+
+    def display(self, table_index: int, column: int) -> str:
+        """Text of a cell, the raw value unless the subclass formats it"""
+        return str(self.value(table_index, column))
+
+    def value(self, table_index: int, column: int):
+        """Raw value of a cell: the field of the column's sort key, the table index if it has none"""
+        key = self.COLUMNS[column][1]
+        return table_index if key is None else self.table[table_index][key]
+
+    def row_text(self, row: int) -> str:
+        """Lowercase text of all the cells of a row, for filtering"""
+        table_index = self.table_index(row)
+        return " ".join(self.display(table_index, column) for column in range(len(self.COLUMNS))).lower()
+
+    def sorted_indices(self, column: int, reverse: bool) -> List[int]:
+        key = self.COLUMNS[column][1]
+        if key is None:
+            indices = list(range(len(self.table)))
+            return indices[::-1] if reverse else indices
+        return self.table.sorted_indices(key, reverse=reverse)
+
+    def sort(self, column: int, order=Qt.SortOrder.AscendingOrder) -> None:
+        if not 0 <= column < len(self.COLUMNS):
+            return
+        self._sort_order = (column, order)
+        if self.table is None:
+            return
+
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        old_rows = [self.table_index(index.row()) for index in old_indexes]
+
+        self._rows = self.sorted_indices(column, order == Qt.SortOrder.DescendingOrder)
+
+        # Keep the selection and the proxy mapping on the same table rows
+        position = [0] * len(self._rows)
+        for row, table_index in enumerate(self._rows):
+            position[table_index] = row
+        self.changePersistentIndexList(old_indexes, [self.index(position[table_index], index.column())
+                                                     for table_index, index in zip(old_rows, old_indexes)])
+        self.layoutChanged.emit()
+
+class SegmentTableModel(ColumnarTableModel):
+    COLUMNS = (("Name", None), ("Size", 'compressed_size'), ("Original Size", 'uncompressed_size'),
+               ("Offset", 'offset'), ("Flags", 'flags'))
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._flag_text = {}
+
+    def flags_text(self, flags: int) -> str:
+        # Few distinct flag combinations exist, format each of them once
+        text = self._flag_text.get(flags)
+        if text is None:
+            text = self._flag_text[flags] = ", ".join(
+                label for name, label in FLAG_LABELS.items() if flags & SEGMENT_FLAG_FIELDS[name])
+        return text
+
+    def display(self, table_index: int, column: int) -> str:
+        if column == 0:
+            return f"Segment {table_index}"
+        if column == 1:
+            return f"{self.table.compressed_sizes[table_index]} bytes"
+        if column == 2:
+            return f"{self.table.uncompressed_sizes[table_index]} bytes"
+        if column == 3:
+            return f"0x{self.table.offsets[table_index]:X}"
+        return self.flags_text(self.table.flags[table_index])
+
+    def value(self, table_index: int, column: int):
+        return (table_index, self.table.compressed_sizes[table_index], self.table.uncompressed_sizes[table_index],
+                self.table.offsets[table_index], self.table.flags[table_index])[column]
+
+    def sorted_indices(self, column: int, reverse: bool) -> List[int]:
+        if self.COLUMNS[column][1] == 'flags':
+            return sorted(range(len(self.table)), key=self.table.flags.__getitem__, reverse=reverse)
+        return super().sorted_indices(column, reverse)
+
+class EntryTableModel(ColumnarTableModel):
+    COLUMNS = (("Name", 'name'), ("Size", 'size'), ("Start Sector", 'start_sector'), ("Offset", 'offset'))
+
+    def display(self, table_index: int, column: int) -> str:
+        if column == 0:
+            return self.table.names[table_index]
+        if column == 1:
+            return f"{self.table.sizes[table_index]} bytes"
+        if column == 2:
+            start_sector = self.table.start_sectors[table_index]
+            return f"{start_sector} (0x{start_sector:X})"
+        return f"0x{self.table.offsets[table_index]:X}"
+
+    def value(self, table_index: int, column: int):
+        return (self.table.names[table_index], self.table.sizes[table_index],
+                self.table.start_sectors[table_index], self.table.offsets[table_index])[column]
+
+class TableFilterProxyModel(QSortFilterProxyModel):
+    """
+    Filters the rows on the text of any column (case insensitive) and
+    delegates sorting to the source model, which sorts its columns without
+    a Python comparison per pair of rows.
+    """
+
+    def __init__(self, source: ColumnarTableModel, parent=None):
+        super().__init__(parent)
+        self.setSourceModel(source)
+        self.setSortRole(SORT_ROLE)
+        self.filter_text = ""
+
+    def set_filter_text(self, text: str) -> None:
+        self.filter_text = text.strip().lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row: int, source_parent) -> bool:
+        # One call per row on the formatted text, instead of a data() call per cell
+        return not self.filter_text or self.filter_text in self.sourceModel().row_text(source_row)
+
+    def sort(self, column: int, order=Qt.SortOrder.AscendingOrder) -> None:
+        self.sourceModel().sort(column, order)
+
+    def table_indices(self, proxy_indexes) -> List[int]:
+        """Table indices of the given rows of the proxy, e.g. the selected rows"""
+        source = self.sourceModel()
+        return [source.table_index(self.mapToSource(index).row()) for index in proxy_indexes]
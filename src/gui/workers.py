@@ -0,0 +1,56 @@
+import time
+import traceback
+from typing import Callable
+from PyQt6.QtCore import QThread, pyqtSignal
+from core.progress import CancelToken
+
+class OperationWorker(QThread):
+    """
+    Run a long core operation (load, extract) off the GUI thread.
+
+    The function is called as function(*args, progress=..., cancel=...,
+    **kwargs). Progress is forwarded as bytes done, bytes total and
+    throughput in bytes per second, at most every PROGRESS_INTERVAL
+    seconds; cancel() asks the operation to stop at its next check.
+    """
+
+    # done bytes, total bytes, bytes per second (object: sizes can exceed 32 bits)
+    progress = pyqtSignal(object, object, float)
+    # Return value of the function, None if it raised
+    result_ready = pyqtSignal(object)
+
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, function: Callable, *args, **kwargs):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.cancel_token = CancelToken()
+        self._start = 0.0
+        self._last_report = 0.0
+
+    def run(self):
+        self._start = time.monotonic()
+        try:
+            result = self.function(*self.args, progress=self._report, cancel=self.cancel_token, **self.kwargs)
+        except Exception as e:
+            print(f"Error during the operation: {e}")
+            traceback.print_exc()
+            result = None
+        self.result_ready.emit(result)
+
+    def cancel(self):
+        self.cancel_token.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_token.cancelled
+
+    def _report(self, done: int, total: int):
+        now = time.monotonic()
+        if now - self._last_report < self.PROGRESS_INTERVAL and done < total:
+            return
+        self._last_report = now
+        elapsed = now - self._start
+        self.progress.emit(done, total, done / elapsed if elapsed > 0 else 0.0)
@@ -1,7 +1,5 @@
 import sys
 import logging
-from PyQt6.QtWidgets import QApplication
-from gui.main_window import MainWindow
 
 # GUI Definition
 gui = """
@@ -26,8 +24,19 @@ logging.basicConfig(
 logger = logging.getLogger('PupUnpacker')
 
 def main():
+    # Startup measurement mode: report the import cost of each module
+    if '--profile-imports' in sys.argv[1:]:
+        from utils.startup import main as profile_imports
+        argv = sys.argv[1:]
+        argv.remove('--profile-imports')
+        sys.exit(profile_imports(argv))
+        
     logger.info("start application")
     
+    # PyQt6 and the GUI are only loaded once the application starts
+    from PyQt6.QtWidgets import QApplication
+    from gui.main_window import MainWindow
+    
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -1,6 +1,14 @@
+import errno
 import os
 import hashlib
-from typing import Optional
+from typing import Callable, List, Optional
+
+# Bytes copied at a time, between two progress reports
+COPY_CHUNK_SIZE = 0x100000  # 1MB
+
+# Errors meaning that a kernel copy is not supported for these two files
+_COPY_UNSUPPORTED = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP,
+                     errno.EBADF, errno.ENOTSOCK, errno.ESPIPE}
 
 def calculate_file_hash(file_path: str, algorithm: str = 'sha256') -> str:
     """calculate file hash"""
@@ -46,4 +54,86 @@ def find_files_by_extension(directory: str, extension: str) -> list:
         for file in files:
             if file.endswith(extension):
                 matching_files.append(os.path.join(root, file))
-    return matching_files 
\ No newline at end of file
+    return matching_files 
+
+def _kernel_copy(copy: Callable[[int, int], int], offset: int, size: int, done: int,
+                 progress: Optional[Callable[[int, int], None]], chunk_size: int) -> int:
+    """Run copy(source_position, count) until size bytes are copied, return the bytes done"""
+    while done < size:
+        try:
+            copied = copy(offset + done, min(chunk_size, size - done))
+        except OSError as e:
+            if e.errno in _COPY_UNSUPPORTED:
+                return done
+            raise
+        if copied == 0:
+            # End of the source file
+            break
+        done += copied
+        if progress:
+            progress(done, size)
+    return done
+
+def preallocate(file, size: int) -> bool:
+    """Reserve size bytes for an open file in one extent (posix_fallocate), where supported"""
+    if size <= 0 or not hasattr(os, 'posix_fallocate'):
+        return False
+    try:
+        os.posix_fallocate(file.fileno(), 0, size)
+        return True
+    except OSError:
+        # Not supported by the filesystem, the file just grows as it is written
+        return False
+
+def copy_range(source, destination, offset: int, size: int,
+               progress: Optional[Callable[[int, int], None]] = None,
+               chunk_size: int = COPY_CHUNK_SIZE, hashers: Optional[List] = None) -> int:
+    """
+    Copy size bytes from offset of the open file source to the beginning of
+    the open file destination, without reading them into Python.
+    
+    os.copy_file_range is tried first (the kernel copies or clones the data),
+    then os.sendfile, then a readinto loop on a single reusable buffer.
+    progress(done, size) is called after each chunk and may raise to stop
+    the copy. Returns the bytes copied, less than size if the source ends.
+    
+    hashers (hashlib objects) are updated with the bytes as they are copied;
+    the data then has to pass through the buffer, so the kernel copies are
+    skipped.
+    """
+    destination.flush()
+    source_fd = source.fileno()
+    destination_fd = destination.fileno()
+    done = 0
+    
+    if hasattr(os, 'copy_file_range') and not hashers:
+        done = _kernel_copy(
+            lambda position, count: os.copy_file_range(source_fd, destination_fd, count, position, position - offset),
+            offset, size, done, progress, chunk_size)
+            
+    if done < size and hasattr(os, 'sendfile') and not hashers:
+        os.lseek(destination_fd, done, os.SEEK_SET)
+        done = _kernel_copy(
+            lambda position, count: os.sendfile(destination_fd, source_fd, position, count),
+            offset, size, done, progress, chunk_size)
+            
+    if done < size:
+        buffer = bytearray(min(chunk_size, size - done))
+        view = memoryview(buffer)
+        source.seek(offset + done)
+        destination.seek(done)
+        while done < size:
+            read = source.readinto(view[:min(len(buffer), size - done)])
+            if not read:
+                break
+            for hasher in hashers or ():
+                hasher.update(view[:read])
+            destination.write(view[:read])
+            done += read
+            if progress:
+                progress(done, size)
+        destination.flush()
+        
+    destination.seek(done)
+    return done
+
@@ -0,0 +1,196 @@
+"""
+Lightweight instrumentation: named spans and counters.
+
+The core modules call span() and count() at the points where time goes
+(read, scan, decompress, hash, write, analyze). Nothing is recorded until
+enable() is called: span() then returns a shared no-op context manager and
+count() returns at once, so the disabled cost is a global lookup.
+
+    instrumentation = enable()
+    ...
+    print(instrumentation.metrics())
+    instrumentation.dump('trace.json', 'chrome')  # chrome://tracing, Perfetto
+"""
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+class _NullSpan:
+    """Span returned while the instrumentation is disabled"""
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+        
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('_owner', 'name', 'args', 'start', 'child_time')
+    
+    def __init__(self, owner: 'Instrumentation', name: str, args: Dict):
+        self._owner = owner
+        self.name = name
+        self.args = args
+        self.start = 0.0
+        self.child_time = 0.0
+        
+    def __enter__(self):
+        self._owner._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        stack = self._owner._stack()
+        stack.pop()
+        if stack:
+            # Time spent in nested spans is not part of the parent's own time
+            stack[-1].child_time += duration
+        self._owner._record(self, duration)
+        return False
+        
+class Instrumentation:
+    """
+    Collects spans and counters.
+    
+    Each finished span is stored as an event and passed to callback(event),
+    if given. Spans nest per thread: the metrics report both the total time
+    of each span name and its self time, without the nested spans, so
+    that a decompress inside a write is not counted twice.
+    """
+    
+    def __init__(self, callback: Optional[Callable[[Dict], None]] = None):
+        self.callback = callback
+        self.events: List[Dict] = []
+        self.counters: Dict[str, int] = {}
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        
+    def _stack(self) -> List[_Span]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+        
+    def span(self, name: str, **args) -> _Span:
+        """Context manager timing one occurrence of a phase"""
+        return _Span(self, name, args)
+        
+    def count(self, name: str, value: int = 1) -> None:
+        """Add value to a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            
+    def _record(self, span: _Span, duration: float) -> None:
+        event = {
+            'name': span.name,
+            'start': span.start - self._origin,
+            'duration': duration,
+            'self': duration - span.child_time,
+            'thread': threading.get_ident(),
+            'args': span.args
+        }
+        with self._lock:
+            self.events.append(event)
+        if self.callback:
+            self.callback(event)
+            
+    def reset(self) -> None:
+        """Drop the recorded spans and counters"""
+        with self._lock:
+            self.events = []
+            self.counters = {}
+            self._origin = time.perf_counter()
+            
+    def metrics(self) -> Dict:
+        """Summary per span name (count, total, self and max time) and the counters"""
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+            
+        spans: Dict[str, Dict] = {}
+        for event in events:
+            summary = spans.setdefault(event['name'], {'count': 0, 'total_s': 0.0, 'self_s': 0.0, 'max_s': 0.0})
+            summary['count'] += 1
+            summary['total_s'] += event['duration']
+            summary['self_s'] += event['self']
+            summary['max_s'] = max(summary['max_s'], event['duration'])
+            
+        return {
+            'wall_s': time.perf_counter() - self._origin,
+            'spans': spans,
+            'counters': counters
+        }
+        
+    def chrome_trace(self) -> Dict:
+        """Events in the Chrome trace format (chrome://tracing, Perfetto)"""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+            
+        trace = [
+            {
+                'name': event['name'],
+                'ph': 'X',
+                'ts': event['start'] * 1e6,
+                'dur': event['duration'] * 1e6,
+                'pid': pid,
+                'tid': event['thread'],
+                'args': {key: str(value) for key, value in event['args'].items()}
+            }
+            for event in events
+        ]
+        end = max((event['start'] + event['duration'] for event in events), default=0.0)
+        trace.extend({'name': name, 'ph': 'C', 'ts': end * 1e6, 'pid': pid, 'args': {name: value}}
+                     for name, value in counters.items())
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+        
+    def dump(self, path: str, format: str = 'json') -> None:
+        """Write the metrics and events ('json') or a Chrome trace ('chrome') to path"""
+        if format == 'chrome':
+            report = self.chrome_trace()
+        elif format == 'json':
+            with self._lock:
+                events = list(self.events)
+            report = {'metrics': self.metrics(), 'events': events}
+        else:
+            raise ValueError(f"Unknown format: {format}")
+            
+        with open(path, 'w') as f:
+            json.dump(report, f, default=str)
+            
+# Instrumentation in use, None while disabled
+_current: Optional[Instrumentation] = None
+
+def enable(callback: Optional[Callable[[Dict], None]] = None) -> Instrumentation:
+    """Start recording spans and counters, return the collecting Instrumentation"""
+    global _current
+    _current = Instrumentation(callback)
+    return _current
+
+def disable() -> Optional[Instrumentation]:
+    """Stop recording, return the Instrumentation that was in use"""
+    global _current
+    instrumentation, _current = _current, None
+    return instrumentation
+
+def current() -> Optional[Instrumentation]:
+    return _current
+
+def span(name: str, **args):
+    """Time a phase: with span('scan'): ..."""
+    if _current is None:
+        return _NULL_SPAN
+    return _current.span(name, **args)
+
+def count(name: str, value: int = 1) -> None:
+    """Add value to a counter"""
+    if _current is not None:
+        _current.count(name, value)
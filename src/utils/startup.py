@@ -0,0 +1,101 @@
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+# Modules measured by default: GUI entry point, core library and the optional features
+DEFAULT_MODULES = [
+    'gui.main_window',
+    'cli',
+    'core.pup_file',
+    'core.slb2_file',
+    'core.cert_analyzer',
+    'crypto.pup_analyzer',
+    'crypto.decryption'
+]
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure_import(module: str, top: int = 5) -> Dict:
+    """Import a module in a fresh interpreter and return its import cost"""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True
+    )
+
+    # Lines look like "import time:  self [us] | cumulative | imported package",
+    # nested imports are indented and printed before the module importing them
+    imports = []
+    nested = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.rstrip()
+        nested.append((int(cumulative_us), int(self_us), name.strip()))
+        if not name.startswith('  '):
+            # Top-level import: the modules loaded by the interpreter at
+            # startup come before the one being measured
+            if name.strip() == module:
+                imports = nested
+            nested = []
+
+    result = {
+        'module': module,
+        'total_ms': imports[-1][0] / 1000 if imports else 0.0,
+        'imports': len(imports),
+        'heaviest': []
+    }
+    if process.returncode != 0:
+        result['error'] = process.stderr.strip().splitlines()[-1]
+        return result
+
+    result['heaviest'] = [
+        {'name': name, 'cumulative_ms': cumulative / 1000, 'self_ms': self_us / 1000}
+        for cumulative, self_us, name in sorted(imports[:-1], reverse=True)[:top]
+    ]
+    return result
+
+def measure_startup(modules: Optional[List[str]] = None) -> List[Dict]:
+    """Measure the cold import time of each module"""
+    return [measure_import(module) for module in modules or DEFAULT_MODULES]
+
+def format_report(results: List[Dict]) -> str:
+    """Format the measurements as a text report"""
+    report = ["=== Startup import time ==="]
+    for result in results:
+        if 'error' in result:
+            report.append(f"{result['module']:<24} error: {result['error']}")
+            continue
+        report.append(f"{result['module']:<24} {result['total_ms']:8.1f} ms  ({result['imports']} modules)")
+        for item in result['heaviest']:
+            report.append(f"    {item['name']:<36} {item['cumulative_ms']:8.1f} ms cumulative, {item['self_ms']:6.1f} ms self")
+    return "\n".join(report)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Print the import cost of each module.
+    
+    Usage: [--budget-ms N] [module ...]
+    With --budget-ms the exit status is 1 if a module takes longer than N ms.
+    """
+    argv = list(argv or [])
+    budget_ms = None
+    if '--budget-ms' in argv:
+        position = argv.index('--budget-ms')
+        budget_ms = float(argv[position + 1])
+        del argv[position:position + 2]
+
+    results = measure_startup(argv or None)
+    print(format_report(results))
+
+    if budget_ms is not None:
+        over_budget = [r['module'] for r in results if 'error' in r or r['total_ms'] > budget_ms]
+        if over_budget:
+            print(f"Over the {budget_ms:.0f} ms budget: {', '.join(over_budget)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))